@@ -0,0 +1,301 @@
+""" Synthetic fraud datasets with the schema of data/fraud_data.csv, at any scale
+
+Usage: python -m benchmarks.generate_data --scale 10 [--output path] [--seed 0]
+"""
+
+import argparse
+import datetime as dt
+import os
+
+import numpy as np
+import pandas as pd
+
+PATH_TO_DATA = "data/fraud_data.csv"
+PATH_TO_CLIENTS = "data/clients.csv"
+OUTPUT_PATH = "data/synthetic"
+# Number of rows at scale 1 when data/fraud_data.csv is not available
+DEFAULT_BASE_ROWS = 100_000
+CHUNK_ROWS = 1_000_000
+
+START_DATE = dt.datetime(2020, 6, 21, tzinfo=dt.timezone.utc)
+END_DATE = dt.datetime(2021, 1, 1, tzinfo=dt.timezone.utc)
+
+COLUMNS = [
+    "Unnamed: 0",
+    "trans_date_trans_time",
+    "cc_num",
+    "merchant",
+    "category",
+    "amt",
+    "first",
+    "last",
+    "gender",
+    "street",
+    "city",
+    "state",
+    "zip",
+    "lat",
+    "long",
+    "city_pop",
+    "job",
+    "dob",
+    "trans_num",
+    "unix_time",
+    "merch_lat",
+    "merch_long",
+    "is_fraud",
+]
+
+# Share of the transactions, relative fraud rate, and log-normal
+# parameters of the legitimate amounts of each category
+CATEGORIES = pd.DataFrame(
+    [
+        ("entertainment", 0.072, 0.5, 3.9, 1.0),
+        ("food_dining", 0.071, 0.4, 3.5, 1.0),
+        ("gas_transport", 0.102, 1.0, 4.1, 0.4),
+        ("grocery_net", 0.035, 0.7, 3.9, 0.5),
+        ("grocery_pos", 0.095, 3.5, 4.6, 0.4),
+        ("health_fitness", 0.066, 0.4, 3.6, 0.9),
+        ("home", 0.095, 0.4, 3.8, 1.0),
+        ("kids_pets", 0.087, 0.5, 3.6, 1.0),
+        ("misc_net", 0.049, 3.3, 3.5, 1.3),
+        ("misc_pos", 0.061, 0.8, 3.5, 1.2),
+        ("personal_care", 0.070, 0.6, 3.4, 1.0),
+        ("shopping_net", 0.075, 4.5, 3.9, 1.2),
+        ("shopping_pos", 0.090, 1.8, 3.9, 1.2),
+        ("travel", 0.032, 0.7, 2.5, 1.6),
+    ],
+    columns=["category", "share", "fraud_lift", "amount_mean", "amount_sigma"],
+)
+FRAUD_RATE = 0.0039
+# Fraudulent amounts are higher and mostly happen at night
+FRAUD_AMOUNT_MEAN, FRAUD_AMOUNT_SIGMA = 5.6, 0.7
+LEGIT_HOURS = np.array(
+    [2, 2, 2, 2, 2, 2, 3, 3, 4, 5, 5, 5, 6, 7, 7, 6, 6, 6, 6, 5, 5, 4, 3, 3],
+    dtype=float,
+)
+FRAUD_HOURS = np.array(
+    [9, 9, 9, 8, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 9, 9],
+    dtype=float,
+)
+MERCHANTS_PER_CATEGORY = 50
+MERCHANT_SUFFIXES = ["and Sons", "Group", "Inc", "LLC", "Ltd", "PLC", "& Co"]
+
+
+def get_base_rows() -> int:
+    """
+    Returns the number of rows at scale 1, the size of the real dataset
+    """
+    if not os.path.exists(PATH_TO_DATA):
+        return DEFAULT_BASE_ROWS
+    with open(PATH_TO_DATA, "rb") as data_file:
+        return sum(1 for _ in data_file) - 1
+
+
+def generate_clients(
+    seed_clients: pd.DataFrame, scale: int, rng: np.random.Generator
+) -> pd.DataFrame:
+    """
+    Creates `scale` clients per seed client: the first copy is the seed client,
+    the others combine the names of random seed clients with a seed profile
+
+    Args:
+        - seed_clients: the clients of data/clients.csv
+        - scale: the number of clients per seed client
+        - rng: the random generator
+
+    Returns:
+        - the clients with their transaction columns and their activity weight
+    """
+    n_seed = len(seed_clients)
+    n_clients = n_seed * scale
+    profile = np.arange(n_clients) % n_seed
+    first_donor = np.where(
+        profile == np.arange(n_clients), profile, rng.integers(0, n_seed, n_clients)
+    )
+    last_donor = np.where(
+        profile == np.arange(n_clients), profile, rng.integers(0, n_seed, n_clients)
+    )
+    clients = pd.DataFrame(
+        {
+            "first": seed_clients["First Name"].values[first_donor],
+            "last": seed_clients["Last Name"].values[last_donor],
+            "gender": seed_clients["Gender"].values[profile],
+            "street": seed_clients["Street Address"].values[profile],
+            "city": seed_clients["City"].values[profile],
+            "state": seed_clients["State"].values[profile],
+            "zip": seed_clients["ZIP Code"].values[profile],
+            "lat": seed_clients["Latitude"].values[profile],
+            "long": seed_clients["Longitude"].values[profile],
+            "city_pop": seed_clients["City Population"].values[profile],
+            "job": seed_clients["Job Title"].values[profile],
+        }
+    )
+    # The app identifies clients by name, homonyms get a numbered last name
+    homonym = clients.groupby(["first", "last"]).cumcount()
+    clients.loc[homonym > 0, "last"] = (
+        clients["last"] + " " + (homonym + 1).astype(str)
+    )[homonym > 0]
+
+    age = seed_clients["Age"].values[profile] + rng.integers(-3, 4, n_clients)
+    birth_year = dt.date.today().year - np.clip(age, 18, 95)
+    clients["dob"] = [
+        f"{year}-{month:02d}-{day:02d}"
+        for year, month, day in zip(
+            birth_year, rng.integers(1, 13, n_clients), rng.integers(1, 29, n_clients)
+        )
+    ]
+    clients["cc_num"] = rng.integers(10**15, 10**16, n_clients, dtype=np.int64)
+    # A few clients make most of the transactions
+    activity = rng.lognormal(0, 1, n_clients)
+    clients["activity"] = activity / activity.sum()
+    return clients
+
+
+def generate_merchants(
+    seed_clients: pd.DataFrame, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Returns MERCHANTS_PER_CATEGORY merchant names per category
+    """
+    names = rng.choice(
+        seed_clients["Last Name"].unique(), (len(CATEGORIES), MERCHANTS_PER_CATEGORY)
+    )
+    suffixes = rng.choice(MERCHANT_SUFFIXES, names.shape)
+    return np.char.add(
+        np.char.add("fraud_", names.astype(str)), np.char.add(" ", suffixes)
+    )
+
+
+def generate_chunk(
+    clients: pd.DataFrame,
+    merchants: np.ndarray,
+    first_row: int,
+    n_rows: int,
+    start: int,
+    end: int,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """
+    Generates n_rows transactions between two midnights, sorted by date
+
+    Args:
+        - clients: the clients generated by generate_clients
+        - merchants: the merchants generated by generate_merchants
+        - first_row: the row number of the first transaction
+        - n_rows: the number of transactions
+        - start: the UNIX timestamp of the first day
+        - end: the UNIX timestamp of the day after the last one
+        - rng: the random generator
+    """
+    client = rng.choice(len(clients), n_rows, p=clients["activity"].values)
+    category = rng.choice(len(CATEGORIES), n_rows, p=CATEGORIES["share"].values)
+
+    fraud_lift = CATEGORIES["fraud_lift"].values
+    fraud_probability = FRAUD_RATE * fraud_lift / (CATEGORIES["share"] @ fraud_lift)
+    is_fraud = rng.random(n_rows) < fraud_probability[category]
+
+    amount = np.where(
+        is_fraud,
+        rng.lognormal(FRAUD_AMOUNT_MEAN, FRAUD_AMOUNT_SIGMA, n_rows),
+        rng.lognormal(
+            CATEGORIES["amount_mean"].values[category],
+            CATEGORIES["amount_sigma"].values[category],
+        ),
+    ).round(2)
+
+    day = start + rng.integers(0, (end - start) // 86400, n_rows) * 86400
+    hour = np.where(
+        is_fraud,
+        rng.choice(24, n_rows, p=FRAUD_HOURS / FRAUD_HOURS.sum()),
+        rng.choice(24, n_rows, p=LEGIT_HOURS / LEGIT_HOURS.sum()),
+    )
+    unix_time = day + hour * 3600 + rng.integers(0, 3600, n_rows)
+
+    order = np.argsort(unix_time, kind="stable")
+    client, category, is_fraud = client[order], category[order], is_fraud[order]
+    amount, unix_time = amount[order], unix_time[order]
+
+    chunk = clients.drop(columns="activity").iloc[client].reset_index(drop=True)
+    rows = np.arange(first_row, first_row + n_rows)
+    random_hex = rng.bytes(12 * n_rows).hex()
+    chunk.insert(0, "Unnamed: 0", rows)
+    chunk["trans_date_trans_time"] = pd.to_datetime(unix_time, unit="s").strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    chunk["merchant"] = merchants[
+        category, rng.integers(0, MERCHANTS_PER_CATEGORY, n_rows)
+    ]
+    chunk["category"] = CATEGORIES["category"].values[category]
+    chunk["amt"] = amount
+    # The app keeps the first 8 characters, unique up to 2**32 rows
+    chunk["trans_num"] = [
+        f"{row:08x}{random_hex[24 * i : 24 * (i + 1)]}" for i, row in enumerate(rows)
+    ]
+    chunk["unix_time"] = unix_time
+    chunk["merch_lat"] = (chunk["lat"] + rng.uniform(-1, 1, n_rows)).round(6)
+    chunk["merch_long"] = (chunk["long"] + rng.uniform(-1, 1, n_rows)).round(6)
+    chunk["is_fraud"] = is_fraud.astype(int)
+    return chunk[COLUMNS]
+
+
+def generate_dataset(scale: int, output: str, seed: int = 0) -> dict:
+    """
+    Writes a dataset `scale` times bigger than the real one, chunk by chunk
+
+    Args:
+        - scale: the number of rows and of clients relative to the real dataset
+        - output: the path of the CSV file
+        - seed: the seed of the random generator
+
+    Returns:
+        - a summary of the dataset
+    """
+    rng = np.random.default_rng(seed)
+    seed_clients = pd.read_csv(PATH_TO_CLIENTS)
+    clients = generate_clients(seed_clients, scale, rng)
+    merchants = generate_merchants(seed_clients, rng)
+
+    n_rows = get_base_rows() * scale
+    # Chunks are made of whole days of about CHUNK_ROWS transactions
+    n_days = (END_DATE - START_DATE).days
+    days_per_chunk = max(1, n_days * CHUNK_ROWS // n_rows)
+    bounds = list(range(0, n_days, days_per_chunk)) + [n_days]
+    n_chunks = len(bounds) - 1
+    start = int(START_DATE.timestamp())
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    frauds = 0
+    for i in range(n_chunks):
+        first_row = bounds[i] * n_rows // n_days
+        chunk_rows = bounds[i + 1] * n_rows // n_days - first_row
+        chunk = generate_chunk(
+            clients,
+            merchants,
+            first_row,
+            chunk_rows,
+            start + bounds[i] * 86400,
+            start + bounds[i + 1] * 86400,
+            rng,
+        )
+        chunk.to_csv(output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        frauds += int(chunk["is_fraud"].sum())
+    return {
+        "path": output,
+        "scale": scale,
+        "rows": n_rows,
+        "clients": len(clients),
+        "fraud_rate": frauds / n_rows,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10, help="e.g. 10, 100 or 1000")
+    parser.add_argument(
+        "--output", help="defaults to data/synthetic/fraud_data_x<scale>.csv"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(OUTPUT_PATH, f"fraud_data_x{args.scale}.csv")
+    print(generate_dataset(args.scale, output, args.seed))
@@ -0,0 +1,78 @@
+""" Import time of every module loaded by the app, from python -X importtime
+
+Usage: python -m benchmarks.import_profile [module] [--top 25] [--output path]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+
+def profile_imports(module: str = "main") -> dict:
+    """
+    Imports a module in a new interpreter and parses its import times
+
+    Args:
+        - module: the imported module, main imports the whole app without running it
+
+    Returns:
+        - the wall time of the import and, by module, its own and cumulative
+          import times in seconds
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = {
+            "self": int(own) / 1e6,
+            "cumulative": int(cumulative) / 1e6,
+            "package": name.strip().split(".")[0],
+        }
+    if process.returncode != 0:
+        print(process.stderr.splitlines()[-1], file=sys.stderr)
+    return {"module": module, "wall": wall, "modules": modules}
+
+
+def packages_cost(modules: dict) -> dict:
+    """
+    Returns the import time of each top-level package, the sum of its modules
+    """
+    packages = {}
+    for result in modules.values():
+        packages[result["package"]] = (
+            packages.get(result["package"], 0) + result["self"]
+        )
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--output", help="writes the whole profile as JSON")
+    args = parser.parse_args()
+
+    profile = profile_imports(args.module)
+    profile["packages"] = packages_cost(profile["modules"])
+    print(f"import {args.module}: {profile['wall']:.2f}s\n")
+    print(f"{'package':<40}{'seconds':>10}")
+    for package, seconds in list(profile["packages"].items())[: args.top]:
+        print(f"{package:<40}{seconds:>10.3f}")
+    print(f"\n{'module':<60}{'self':>10}{'cumulative':>12}")
+    slowest = sorted(profile["modules"].items(), key=lambda item: -item[1]["self"])
+    for name, result in slowest[: args.top]:
+        print(f"{name:<60}{result['self']:>10.3f}{result['cumulative']:>12.3f}")
+
+    if args.output:
+        with open(args.output, "w") as profile_file:
+            json.dump(profile, profile_file, indent=2)
@@ -0,0 +1,273 @@
+""" End-to-end benchmarks of the data loading, the scoring, the callbacks and the charts
+
+Usage: python -m benchmarks.run_benchmarks [--data path] [--repeat 5] [--output path]
+       python -m benchmarks.run_benchmarks --compare before.json after.json
+"""
+
+import argparse
+import datetime as dt
+import importlib
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable
+
+REPORTS_PATH = "benchmarks/reports"
+# Number of calls timed together for the functions that are fast on their own
+SAMPLE_SIZE = 100
+# A benchmark slower than this ratio of its previous median is a regression
+REGRESSION_TOLERANCE = 0.1
+
+
+def measure(
+    function: Callable, repeat: int, setup: Callable = None, calls: int = 1
+) -> dict:
+    """
+    Times a function `repeat` times
+
+    Args:
+        - function: the timed function, called with the result of setup if any
+        - repeat: the number of timings
+        - setup: prepares the argument of the function, outside of the timing
+        - calls: the number of calls made by the function, to time one call
+
+    Returns:
+        - the statistics of the timings in seconds per call
+    """
+    timings = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - start) / calls)
+    return {
+        "repeat": repeat,
+        "calls": calls,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "max": max(timings),
+    }
+
+
+def get_metadata(path: str) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for package in ["pandas", "numpy", "xgboost", "shap", "plotly", "taipy"]:
+        try:
+            versions[package] = importlib.import_module(package).__version__
+        except (ImportError, AttributeError):
+            versions[package] = None
+    return {
+        "created": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "packages": versions,
+        "dataset": path,
+    }
+
+
+def run_benchmarks(path: str, repeat: int) -> dict:
+    """
+    Benchmarks the app on a dataset
+
+    Args:
+        - path: the path of a dataset with the schema of data/fraud_data.csv
+        - repeat: the number of timings of each benchmark
+
+    Returns:
+        - the report, with the metadata of the run and the timings by benchmark
+    """
+    # data.data loads the dataset on import
+    os.environ["FRAUD_DATA_PATH"] = path
+    if os.path.abspath(path) != os.path.abspath("data/fraud_data.csv"):
+        os.environ["FRAUD_CLIENTS_PATH"] = os.path.splitext(path)[0] + "_clients.csv"
+    results = {}
+
+    results["data_load"] = measure(lambda: importlib.import_module("data.data"), 1)
+    data_module = sys.modules["data.data"]
+
+    import pandas as pd
+
+    import utils
+    from client import Client, Transaction
+    from pages.transactions import charts
+
+    data, data_clients = data_module.data, data_module.data_clients
+
+    results["read_csv"] = measure(lambda: pd.read_csv(path), repeat)
+
+    def read_raw_data():
+        raw = pd.read_csv(path)
+        raw["trans_num"] = raw["trans_num"].apply(lambda x: x[:8])
+        raw["cc_num"] = raw["cc_num"].apply(lambda x: int(str(x)[:8]))
+        return raw
+
+    results["generate_transactions"] = measure(
+        lambda raw: data_module.generate_transactions(
+            None, raw, data_module.model, float(data_module.threshold)
+        ),
+        repeat,
+        setup=read_raw_data,
+    )
+
+    def clear_caches():
+        utils.get_transactions.cache_clear()
+        utils.get_threshold_results.cache_clear()
+
+    date_index = data_module.date_index
+    first_day, last_day = date_index.first_day, date_index.last_day
+    state = SimpleNamespace(
+        threshold="0.3",
+        selected_table="True Positives",
+        dates=[first_day, last_day],
+    )
+    results["update_threshold_cold"] = measure(
+        utils.update_threshold, repeat, setup=lambda: clear_caches() or state
+    )
+    results["update_threshold_warm"] = measure(
+        lambda: utils.update_threshold(state), repeat
+    )
+
+    # The first week, once the threshold results are cached
+    week_state = SimpleNamespace(
+        threshold="0.3",
+        selected_table="True Positives",
+        dates=[first_day, first_day + dt.timedelta(days=6)],
+    )
+    results["update_window_cold"] = measure(
+        utils.update_window,
+        repeat,
+        setup=lambda: utils.get_threshold_results.cache_clear() or week_state,
+    )
+    results["update_window_warm"] = measure(
+        lambda: utils.update_window(week_state), repeat
+    )
+
+    rng = random.Random(0)
+    rows = [rng.randrange(len(data)) for _ in range(SAMPLE_SIZE)]
+    transactions = utils.get_threshold_results(
+        utils.dataset_version, float(data_module.threshold)
+    )["transactions"]
+
+    # Computed once per dataset version, before the first explained row
+    results["velocity_features"] = measure(
+        utils.get_velocity_features,
+        repeat,
+        setup=lambda: utils.get_velocity_features.cache_clear()
+        or utils.dataset_version,
+    )
+
+    def explain_rows():
+        # explain_pred without the state updates and the navigation
+        for row in rows:
+            utils.explanation_data(data_module.explanation[row])
+            utils.client_transaction_index.take(
+                transactions, transactions.iloc[row]["Client"]
+            )
+            utils.velocity_data(row)
+
+    results["explain_pred"] = measure(explain_rows, repeat, calls=SAMPLE_SIZE)
+
+    clients = [data.iloc[row]["Client"] for row in rows]
+    transaction_numbers = [data.iloc[row]["Transaction Number"] for row in rows]
+    results["Client"] = measure(
+        lambda: [Client(client) for client in clients], repeat, calls=SAMPLE_SIZE
+    )
+    results["Transaction"] = measure(
+        lambda: [Transaction(number) for number in transaction_numbers],
+        repeat,
+        calls=SAMPLE_SIZE,
+    )
+
+    # The charts are bound to the same variables as in the Transactions page
+    original_transactions = utils.get_threshold_results(
+        utils.dataset_version, float(data_module.threshold)
+    )["original_transactions"]
+    feature_importance = utils.get_feature_importance(utils.dataset_version)
+    arguments = {
+        "data_clients": data_clients,
+        "importance": feature_importance.importance(),
+        "segment_importance": feature_importance.segment_importance("Category"),
+    }
+    results["feature_importance"] = measure(
+        utils.get_feature_importance,
+        repeat,
+        setup=lambda: utils.get_feature_importance.cache_clear()
+        or utils.dataset_version,
+    )
+    for name, figure in inspect.getmembers(charts, inspect.isfunction):
+        if not name.startswith(("gen_", "plot_")):
+            continue
+        parameter = next(iter(inspect.signature(figure).parameters))
+        argument = arguments.get(parameter, original_transactions)
+        results[f"charts.{name}"] = measure(lambda: figure(argument), repeat)
+
+    metadata = get_metadata(path)
+    metadata.update({"rows": len(data), "clients": len(data_clients)})
+    return {"metadata": metadata, "results": results}
+
+
+def compare_reports(before: dict, after: dict, tolerance: float) -> list:
+    """
+    Prints the median timings of two reports side by side
+
+    Returns:
+        - the names of the benchmarks that are slower than the tolerance
+    """
+    regressions = []
+    print(f"{'benchmark':<48}{'before':>12}{'after':>12}{'ratio':>8}")
+    for name, result in after["results"].items():
+        if name not in before["results"]:
+            print(f"{name:<48}{'':>12}{result['median']:>12.6f}")
+            continue
+        previous = before["results"][name]["median"]
+        ratio = result["median"] / previous if previous else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  slower"
+        print(
+            f"{name:<48}{previous:>12.6f}{result['median']:>12.6f}{ratio:>8.2f}{flag}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="data/fraud_data.csv")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="defaults to benchmarks/reports/<date>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = []
+        for report_path in args.compare:
+            with open(report_path) as report_file:
+                reports.append(json.load(report_file))
+        sys.exit(1 if compare_reports(*reports, args.tolerance) else 0)
+
+    report = run_benchmarks(args.data, args.repeat)
+    output = args.output or os.path.join(
+        REPORTS_PATH, dt.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Report written to {output}")
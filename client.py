@@ -1,4 +1,4 @@
-from data.data import data_transaction, data_clients
+from data.data import data_transaction, data_clients, transaction_index, client_index
 
 
 class Client:
@@ -9,7 +9,8 @@ class Client:
         Parameters:
             row (pd.Series): A row from the DataFrame representing a client.
         """
-        row = data_clients[data_clients["Client"] == client].iloc[0]
+        row = data_clients.iloc[client_index.first(client)]
+        self.name = row["Client"]
         self.first_name = row["First Name"]
         self.last_name = row["Last Name"]
         self.gender = row["Gender"]
@@ -40,9 +41,7 @@ class Transaction:
             row (pd.Series): A row from the DataFrame representing a client.
         """
 
-        row = data_transaction[
-            data_transaction["Transaction Number"] == transaction_number
-        ].iloc[0]
+        row = data_transaction.iloc[transaction_index.first(transaction_number)]
         self.client = Client(row["Client"])
         self.is_fraud = row["is_fraud"]
         self.fraud_confidence = row["Fraud Confidence"]
@@ -2,6 +2,7 @@ from client import Client
 import taipy.gui.builder as tgb
 from state_class import State
 from taipy.gui import notify, navigate
+from data.thumbnails import thumbnail_url
 
 
 def verify_identity(state: State):
@@ -10,7 +11,11 @@ def verify_identity(state: State):
 
 def create_id_card_component():
     with tgb.part("id-card"):
-        tgb.image(lambda client: client.photo, height="100px", width="100px")
+        tgb.image(
+            lambda client: thumbnail_url(client.photo, "card"),
+            height="100px",
+            width="100px",
+        )
 
         # Personal Information
         tgb.text(
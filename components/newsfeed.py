@@ -17,8 +17,8 @@ class NewsFeed:
         self.newsfeed: list = self.get_newsfeed()
 
     def set_newsfeed_df_to_seen(self):
+        self.user.newsfeed_store.mark_seen()
         self.newsfeed_df["unseen"] = False
-        self.user.write_newsfeed(self.newsfeed_df)
 
     def get_number_of_unseen_news(self) -> int:
         return sum(self.newsfeed_df["unseen"])
@@ -32,6 +32,9 @@ class NewsFeed:
 
     def get_newsfeed(self) -> List[TransactionNews]:
         self.newsfeed_df.sort_values(by="timestamp", ascending=False, inplace=True)
+        return self.get_news_from_df(self.newsfeed_df)
+
+    def get_news_from_df(self, newsfeed_df: pd.DataFrame) -> List[TransactionNews]:
         newsfeed = [
             TransactionNews(
                 row["sender_username"],
@@ -43,22 +46,76 @@ class NewsFeed:
                 row["timestamp"],
                 row["unseen"],
             )
-            for _, row in self.newsfeed_df.iterrows()
+            for _, row in newsfeed_df.iterrows()
         ]
         return newsfeed
 
+    def sync(self) -> List[TransactionNews]:
+        """
+        Applies the changes made to the user's newsfeed since it was loaded,
+        without reloading the news that did not change.
+
+        Returns:
+            The news added since then, most recent first.
+        """
+        added, removed = self.user.newsfeed_store.diff(set(self.newsfeed_df["news_id"]))
+        added_df = pd.DataFrame(added, columns=self.newsfeed_df.columns)
+        added_df["timestamp"] = pd.to_datetime(
+            added_df["timestamp"], format="%Y-%m-%dT%H:%M:%S"
+        )
+        added_df.sort_values(by="timestamp", ascending=False, inplace=True)
+        added_news = self.get_news_from_df(added_df)
+
+        self.newsfeed_df = pd.concat(
+            [added_df, self.newsfeed_df[~self.newsfeed_df["news_id"].isin(removed)]],
+            ignore_index=True,
+        )
+        self.newsfeed = added_news + [
+            news for news in self.newsfeed if news.news_id not in removed
+        ]
+        return added_news
+
+    def get_news(self, news_id: str) -> TransactionNews:
+        """
+        Returns the news with this news_id, None if it is not in the newsfeed
+        """
+        for news in self.newsfeed:
+            if news.news_id == news_id:
+                return news
+        return None
+
     def remove_news(self, news_id: str):
         try:
             # Ensure the news_id is found before proceeding
+            self.user.newsfeed_store.delete(news_id)
             self.newsfeed_df = self.newsfeed_df[self.newsfeed_df["news_id"] != news_id]
-            self.user.write_newsfeed(self.newsfeed_df)
-            self.newsfeed_df = self.get_newsfeed_df_from_user()
-            self.newsfeed = self.get_newsfeed()
+            self.newsfeed = [news for news in self.newsfeed if news.news_id != news_id]
         except KeyError:
             print(f"news_id {news_id} not found in the DataFrame.")
 
-    def create_newsfeed(self) -> tgb.Page:
-        with tgb.Page() as page:
-            for news in self.newsfeed:
-                news.create_news()
-        return page
\ No newline at end of file
+
+def create_newsfeed_component():
+    """
+    Creates the newsfeed, one page of news slots bound to `news_page`
+    """
+    with tgb.part("newsfeed"):
+        for slot in range(NEWSFEED_PAGE_SIZE):
+            create_news_slot(slot)
+
+        with tgb.layout(columns="1 1 1", class_name="align-columns-center"):
+            tgb.button(
+                "Newer",
+                on_action=show_newer_news,
+                active="{news_offset > 0}",
+                class_name="plain",
+            )
+            tgb.text(
+                "{min(news_offset + 1, news_total)}-{min(news_offset + len(news_page), news_total)} of {news_total}",
+                class_name="text-center",
+            )
+            tgb.button(
+                "Older",
+                on_action=show_older_news,
+                active="{news_offset + len(news_page) < news_total}",
+                class_name="plain",
+            )
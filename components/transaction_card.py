@@ -2,14 +2,16 @@ from client import Client
 import taipy.gui.builder as tgb
 from state_class import State
 from taipy.gui import notify, navigate
+from instrumentation import instrument
 
 
+@instrument
 def save_analysis(state: State):
     state.user.remove_transaction_to_analyze(
         state.transaction.transaction_number, state.transaction.is_fraud
     )
-    state.transactions_to_analyze = state.user.user_info.transactions_to_analyze.read()
-    state.historical_transactions = state.user.user_info.historical_transactions.read()
+    state.transactions_to_analyze = state.user.get_transactions_to_analyze()
+    state.historical_transactions = state.user.get_historical_transactions()
     notify(state, "success", "Analysis saved!")
     navigate(state, "User")
 
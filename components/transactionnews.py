@@ -2,38 +2,99 @@ import taipy.gui.builder as tgb
 import pandas as pd
 from taipy.gui import notify
 from state_class import State
+from data.data import data, transaction_index
+from data.thumbnails import thumbnail_url
+from instrumentation import instrument
+from functools import lru_cache
 import os
 
 
-def accept(state: State, news_id: str):
-    try:
-        # Copy the data from the state and select the specific row
-        data = state.newsfeed.newsfeed_df.copy()
-        data.set_index("news_id", inplace=True)
+# Number of news rendered at once, older news are paginated
+NEWSFEED_PAGE_SIZE = 10
 
-        if news_id not in data.index:
-            raise KeyError(f"news_id {news_id} not found in the DataFrame.")
+news_page = []
+news_offset = 0
+news_total = 0
+# Partial holding the buttons of each news slot, created with the Gui in main.py
+news_actions = []
+# The buttons of a news have the id NEWS_ID_PREFIX + news_id
+NEWS_ID_PREFIX = "news-"
 
-        transaction_to_add_to_transactions_to_analyze = str(
-            data.at[news_id, "metadata"]
-        )
-        state.user.add_transaction_to_analyze(
-            transaction_to_add_to_transactions_to_analyze
-        )
-        delete_news(state, news_id)
-        state.transactions_to_analyze = state.user.get_transactions_to_analyze()
-        notify(state, "success", "Transaction added")
-    except ValueError:
-        print(f"Invalid news_id: {news_id}. Must be an integer.")
 
+def show_news_page(state: State, offset: int = None):
+    """
+    Binds the news of the current page of the newsfeed to the news slots
 
-def delete_news(state: State, news_id: str):
-    state.newsfeed.remove_news(news_id)
-    state.newsfeed_partial.update_content(state, state.newsfeed.create_newsfeed())
+    Args:
+        - state: the state of the app
+        - offset: the index of the first news to show, the current one if None
+    """
+    if offset is not None:
+        state.news_offset = offset
+    news = state.newsfeed.newsfeed
+    offset = min(state.news_offset, max(0, len(news) - 1))
+    offset -= offset % NEWSFEED_PAGE_SIZE
+    state.news_offset = offset
+    state.news_total = len(news)
+    previous_ids = [record["news_id"] for record in state.news_page]
+    state.news_page = [
+        item.to_record() for item in news[offset : offset + NEWSFEED_PAGE_SIZE]
+    ]
+    # Only the buttons of the slots showing another news are rendered again
+    for slot, record in enumerate(state.news_page):
+        if slot >= len(previous_ids) or previous_ids[slot] != record["news_id"]:
+            state.news_actions[slot].update_content(
+                state, create_news_actions(record["news_id"])
+            )
 
 
-def get_transaction(data, metadata):
-    return data[data["Transaction Number"] == metadata]
+def show_newer_news(state: State):
+    show_news_page(state, max(0, state.news_offset - NEWSFEED_PAGE_SIZE))
+
+
+def show_older_news(state: State):
+    show_news_page(state, state.news_offset + NEWSFEED_PAGE_SIZE)
+
+
+def news_field(news_page, slot, field):
+    return news_page[slot][field] if slot < len(news_page) else ""
+
+
+def get_news_id(id: str) -> str:
+    """
+    Returns the news_id of the news whose button has the id `id`
+    """
+    return id[len(NEWS_ID_PREFIX) :]
+
+
+@instrument
+def accept(state: State, id: str):
+    news = state.newsfeed.get_news(get_news_id(id))
+    if news is None:
+        notify(state, "warning", "This news is no longer in the newsfeed")
+        return
+    state.user.add_transaction_to_analyze(str(news.metadata))
+    delete_news(state, id)
+    state.transactions_to_analyze = state.user.get_transactions_to_analyze()
+    notify(state, "success", "Transaction added")
+
+
+def delete_news(state: State, id: str):
+    state.newsfeed.remove_news(get_news_id(id))
+    show_news_page(state)
+
+
+@lru_cache(maxsize=1024)
+def get_transaction(metadata):
+    return transaction_index.take(data, metadata)
+
+
+@lru_cache(maxsize=None)
+def get_avatar(username):
+    avatar = f"images/{username}.png"
+    if not os.path.exists(avatar):
+        avatar = "images/recommendation.png"
+    return thumbnail_url(avatar, "icon")
 
 
 class TransactionNews:
@@ -57,54 +118,75 @@ class TransactionNews:
         self.timestamp: pd.Timestamp = timestamp
         self.unseen = unseen
 
-    def create_news(self):
-        with tgb.part("transaction"):
-            with tgb.layout(
-                columns="80px 1", gap="20px", class_name="align-columns-center"
-            ):
-                tgb.image(
-                    (
-                        f"images/{self.sender_username}.png"
-                        if os.path.exists(f"images/{self.sender_username}.png")
-                        else "images/recommendation.png"
-                    ),
-                    class_name="recommendation_image",
-                    width="60px",
+    def to_record(self) -> dict:
+        """
+        Returns the values displayed in a news slot
+        """
+        return {
+            "news_id": self.news_id,
+            "metadata": str(self.metadata),
+            "avatar": get_avatar(self.sender_username),
+            "date": self.timestamp.strftime("%a %d %b %Y"),
+            "text": f"{self.sender_username} is sending you a transaction:\n\n*{self.message}*",
+        }
+
+
+def create_news_actions(news_id: str) -> tgb.Page:
+    """
+    Creates the buttons of a news, their id holds its news_id so that a click
+    applies to the news displayed, whatever the news of the slot is by then
+    """
+    with tgb.Page() as actions:
+        with tgb.layout(
+            columns="1 20px",
+            columns__mobile="1 20px",
+            class_name="align-columns-center",
+        ):
+            tgb.button(
+                "Add transaction",
+                on_action=accept,
+                id=f"{NEWS_ID_PREFIX}{news_id}",
+                class_name="fullwidth favorites",
+            )
+            tgb.button(
+                "{DELETE_BUTTON}",
+                on_action=delete_news,
+                id=f"{NEWS_ID_PREFIX}{news_id}",
+                class_name="fullwidth hide",
+            )
+    return actions
+
+
+def create_news_slot(slot: int):
+    """
+    Creates the news card bound to the slot-th news of the current page
+    """
+    with tgb.part("transaction", render=f"{{len(news_page) > {slot}}}"):
+        with tgb.layout(
+            columns="80px 1", gap="20px", class_name="align-columns-center"
+        ):
+            tgb.image(
+                f"{{news_field(news_page, {slot}, 'avatar')}}",
+                class_name="recommendation_image",
+                width="60px",
+            )
+            with tgb.part():
+                tgb.text(
+                    f"{{news_field(news_page, {slot}, 'date')}}",
+                    class_name="timestamp",
                 )
-                with tgb.part():
-                    tgb.text(
-                        self.timestamp.strftime("%a %d %b %Y"),
-                        class_name="timestamp",
-                    )
-                    tgb.text("### Transaction Notification", mode="md")
-                    with tgb.layout(columns="1 200px"):
-                        with tgb.part():
-                            tgb.text(
-                                f"{self.sender_username} is sending you a transaction:\n\n*{self.message}*",
-                                mode="md",
-                            )
-
-                        with tgb.part("container"):
-                            with tgb.layout(
-                                columns="1 20px",
-                                columns__mobile="1 20px",
-                                class_name="align-columns-center",
-                            ):
-                                tgb.button(
-                                    "Add transaction",
-                                    on_action=accept,
-                                    id=self.news_id,
-                                    class_name="fullwidth favorites",
-                                )
-                                tgb.button(
-                                    "{DELETE_BUTTON}",
-                                    on_action=delete_news,
-                                    id=self.news_id,
-                                    class_name="fullwidth hide",
-                                )
-
-            with tgb.expandable(title="Show the transaction", expanded=False):
-                tgb.table(
-                    "{get_transaction(data, '" + str(self.metadata) + "')}",
-                    show_all=True,
-                )
\ No newline at end of file
+                tgb.text("### Transaction Notification", mode="md")
+                with tgb.layout(columns="1 200px"):
+                    with tgb.part():
+                        tgb.text(
+                            f"{{news_field(news_page, {slot}, 'text')}}",
+                            mode="md",
+                        )
+
+                    tgb.part("container", partial=f"{{news_actions[{slot}]}}")
+
+        with tgb.expandable(title="Show the transaction", expanded=False):
+            tgb.table(
+                f"{{get_transaction(news_field(news_page, {slot}, 'metadata'))}}",
+                show_all=True,
+            )
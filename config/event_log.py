@@ -0,0 +1,158 @@
+import os
+import threading
+import pandas as pd
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows, the log is then only safe within one process
+    fcntl = None
+
+
+# A log is folded into its snapshot once it holds this many events
+# and more than twice as many events as there are live entries
+COMPACTION_MIN_EVENTS = 500
+
+
+def read_as_strings(data_node) -> Optional[pd.DataFrame]:
+    """
+    Reads a CSV data node without type inference: ids that look like numbers,
+    such as "01234567" or "1234e567", are kept as they were written
+    """
+    try:
+        return pd.read_csv(data_node.path, dtype=str)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return None
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Changes whenever the file is written, None if the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ProcessLock:
+    def __init__(self, path: str):
+        """
+        Reentrant lock held by one thread of one process at a time.
+
+        The threads of a process share a lock, and the processes serving the
+        app (see serve.py) an advisory lock on `path`, taken by the outermost
+        acquisition of the process.
+
+        Parameters:
+            path (str): The lock file, created if needed.
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._depth == 0 and fcntl is not None:
+                if self._file is None:
+                    self._file = open(self.path, "a")
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            self._lock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._lock.release()
+
+
+class EventLog:
+    def __init__(self, data_node, columns: List[str]):
+        """
+        Append-only log of events stored in a CSV data node.
+
+        Appending only writes the new rows at the end of the file, so the cost of
+        recording an event does not depend on the size of the history. Several
+        processes may share the log: they read and write it holding `lock`, and
+        read the events the others appended with `read_new`.
+
+        Parameters:
+            data_node (DataNode): The CSV data node holding the events.
+            columns (List[str]): The columns of an event, in file order.
+        """
+        self.data_node = data_node
+        self.columns = columns
+        self.lock = ProcessLock(data_node.path + ".lock")
+        self.size = 0
+        # Bytes of the file already read or written by this process
+        self.offset = 0
+
+    def _file_size(self) -> int:
+        try:
+            return os.path.getsize(self.data_node.path)
+        except FileNotFoundError:
+            return 0
+
+    def _to_records(self, events: Optional[pd.DataFrame]) -> List[dict]:
+        if events is None or len(events) == 0:
+            return []
+        events = events.reindex(columns=self.columns).astype(object)
+        events = events.where(events.notna(), None)
+        return events.to_dict("records")
+
+    def read(self) -> List[dict]:
+        with self.lock:
+            self.offset = self._file_size()
+            events = self._to_records(read_as_strings(self.data_node))
+        self.size = len(events)
+        return events
+
+    def read_new(self) -> Optional[List[dict]]:
+        """
+        Returns the events appended by other processes since the log was last
+        read or written by this one, None if the log was truncated since.
+        Only the end of the file is read.
+        """
+        with self.lock:
+            size = self._file_size()
+            if size < self.offset:
+                return None
+            if size == self.offset:
+                return []
+            with open(self.data_node.path, "rb") as log_file:
+                log_file.seek(self.offset)
+                try:
+                    events = pd.read_csv(
+                        log_file, header=None, names=self.columns, dtype=str
+                    )
+                except pd.errors.EmptyDataError:
+                    events = None
+            self.offset = size
+        events = self._to_records(events)
+        self.size += len(events)
+        return events
+
+    def append(self, events: List[dict]):
+        if len(events) == 0:
+            return
+        with self.lock:
+            self.data_node.append(pd.DataFrame(events, columns=self.columns))
+            self.offset = self._file_size()
+        self.size += len(events)
+
+    def should_compact(self, live_entries: int) -> bool:
+        return self.size >= max(COMPACTION_MIN_EVENTS, 2 * live_entries)
+
+    def truncate(self):
+        with self.lock:
+            self.data_node.write(pd.DataFrame(columns=self.columns))
+            self.offset = self._file_size()
+        self.size = 0
@@ -0,0 +1,175 @@
+from typing import Dict, List, Set, Tuple
+
+import pandas as pd
+
+from .event_log import EventLog, file_signature, read_as_strings
+
+
+NEWSFEED_COLUMNS = [
+    "news_id",
+    "sender_username",
+    "receiver_username",
+    "message",
+    "metadata",
+    "message_type",
+    "timestamp",
+    "unseen",
+]
+NEWSFEED_EVENT_COLUMNS = ["event"] + NEWSFEED_COLUMNS
+
+ADD = "add"
+SEEN = "seen"
+DELETED = "deleted"
+# news_id of a "seen" event that applies to the whole newsfeed
+ALL_NEWS = "*"
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+def _as_timestamp(value) -> str:
+    if isinstance(value, str):
+        return value
+    return pd.Timestamp(value).strftime(TIMESTAMP_FORMAT)
+
+
+class NewsfeedStore:
+    def __init__(self, snapshot, events):
+        """
+        Materialized view of a user's newsfeed.
+
+        The newsfeed is the compacted `snapshot` data node followed by the
+        add/seen/deleted events of the `events` data node. Changes are appended
+        to the event log and applied to the in-memory view; the snapshot is
+        only rewritten when the log is compacted.
+
+        Every process serving the app keeps its own view: the events the other
+        processes appended, or their compaction, are read before each access,
+        under a lock shared by all of them.
+
+        Parameters:
+            snapshot (DataNode): The compacted newsfeed (CSV data node).
+            events (DataNode): The newsfeed event log (CSV data node).
+        """
+        self.snapshot = snapshot
+        self.log = EventLog(events, NEWSFEED_EVENT_COLUMNS)
+        self.lock = self.log.lock
+        self.entries: Dict[str, dict] = {}
+        self.version = 0
+        self._snapshot_signature = None
+        with self.lock:
+            self._load()
+
+    def _load(self):
+        self.entries = {}
+        self._snapshot_signature = file_signature(self.snapshot.path)
+        snapshot = read_as_strings(self.snapshot)
+        if snapshot is not None and len(snapshot) > 0:
+            snapshot = snapshot.reindex(columns=NEWSFEED_COLUMNS).astype(object)
+            snapshot = snapshot.where(snapshot.notna(), None)
+            for record in snapshot.to_dict("records"):
+                self._apply(dict(record, event=ADD))
+        for event in self.log.read():
+            self._apply(event)
+
+    def _refresh(self):
+        events = None
+        if file_signature(self.snapshot.path) == self._snapshot_signature:
+            events = self.log.read_new()
+        if events is None:
+            # Compacted by another process
+            self._load()
+            self.version += 1
+        elif events:
+            for event in events:
+                self._apply(event)
+            self.version += 1
+
+    def _apply(self, event: dict):
+        news_id = str(event["news_id"])
+        if event["event"] == ADD:
+            entry = {column: event[column] for column in NEWSFEED_COLUMNS}
+            entry["news_id"] = news_id
+            entry["metadata"] = str(entry["metadata"])
+            entry["timestamp"] = _as_timestamp(entry["timestamp"])
+            entry["unseen"] = _as_bool(entry["unseen"])
+            self.entries[news_id] = entry
+        elif event["event"] == SEEN:
+            if news_id == ALL_NEWS:
+                for entry in self.entries.values():
+                    entry["unseen"] = False
+            elif news_id in self.entries:
+                self.entries[news_id]["unseen"] = False
+        elif event["event"] == DELETED:
+            self.entries.pop(news_id, None)
+
+    def _record(self, events: List[dict]):
+        with self.lock:
+            self._refresh()
+            self.log.append(events)
+            for event in events:
+                self._apply(event)
+            self.version += 1
+            if self.log.should_compact(len(self.entries)):
+                self.compact()
+
+    def add(self, news: List[dict]):
+        self._record([dict(item, event=ADD) for item in news])
+
+    def mark_seen(self, news_id: str = ALL_NEWS):
+        with self.lock:
+            if news_id == ALL_NEWS and self.unseen_count() == 0:
+                return
+            if news_id != ALL_NEWS and not self.entries.get(news_id, {}).get("unseen"):
+                return
+            self._record([{"event": SEEN, "news_id": news_id}])
+
+    def delete(self, news_id: str):
+        with self.lock:
+            self._refresh()
+            if news_id not in self.entries:
+                raise KeyError(news_id)
+            self._record([{"event": DELETED, "news_id": news_id}])
+
+    def compact(self):
+        with self.lock:
+            self._refresh()
+            self.snapshot.write(self.to_frame())
+            self._snapshot_signature = file_signature(self.snapshot.path)
+            self.log.truncate()
+
+    def diff(self, known_ids: Set[str]) -> Tuple[List[dict], Set[str]]:
+        """
+        Compares the newsfeed with the news a reader already has.
+
+        Returns:
+            The entries the reader does not have, and the ids of the news
+            the reader has that were deleted since.
+        """
+        with self.lock:
+            self._refresh()
+            added = [
+                dict(entry)
+                for news_id, entry in self.entries.items()
+                if news_id not in known_ids
+            ]
+            removed = {news_id for news_id in known_ids if news_id not in self.entries}
+        return added, removed
+
+    def unseen_count(self) -> int:
+        with self.lock:
+            self._refresh()
+            return sum(entry["unseen"] for entry in self.entries.values())
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the newsfeed as a DataFrame, timestamps in storage format.
+        """
+        with self.lock:
+            self._refresh()
+            return pd.DataFrame(list(self.entries.values()), columns=NEWSFEED_COLUMNS)
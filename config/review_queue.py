@@ -0,0 +1,153 @@
+from typing import Dict, Iterable, List
+
+from .event_log import EventLog, file_signature
+
+
+REVIEW_EVENT_COLUMNS = ["event", "transaction_id", "decision"]
+
+QUEUED = "queued"
+DECIDED = "decided"
+
+
+class ReviewQueue:
+    def __init__(self, queue, history, journal):
+        """
+        Transactions waiting for a user's review, and the decisions already taken.
+
+        The queue is an insertion-ordered set, so membership checks and removals
+        are O(1). Additions and decisions are appended to the `journal` data node
+        in a single write per batch; the `queue` and `history` JSON data nodes are
+        only rewritten when the journal is compacted.
+
+        Every process serving the app keeps its own copy: the events the other
+        processes appended, or their compaction, are read before each access,
+        under a lock shared by all of them.
+
+        Parameters:
+            queue (DataNode): The compacted list of transactions to analyze.
+            history (DataNode): The compacted list of decisions.
+            journal (DataNode): The review event log (CSV data node).
+        """
+        self.queue_data_node = queue
+        self.history_data_node = history
+        self.log = EventLog(journal, REVIEW_EVENT_COLUMNS)
+        self.lock = self.log.lock
+        self.queue: Dict[str, None] = {}
+        self.history: List[dict] = []
+        self._snapshot_signature = None
+        with self.lock:
+            self._load()
+
+    def __contains__(self, transaction: str) -> bool:
+        with self.lock:
+            self._refresh()
+            return transaction in self.queue
+
+    def _snapshot_files(self):
+        return (
+            file_signature(self.queue_data_node.path),
+            file_signature(self.history_data_node.path),
+        )
+
+    def _load(self):
+        self._snapshot_signature = self._snapshot_files()
+        self.queue = dict.fromkeys(
+            str(transaction) for transaction in self.queue_data_node.read() or []
+        )
+        self.history = list(self.history_data_node.read() or [])
+        for event in self.log.read():
+            self._apply(event)
+
+    def _refresh(self):
+        events = None
+        if self._snapshot_files() == self._snapshot_signature:
+            events = self.log.read_new()
+        if events is None:
+            # Compacted by another process
+            self._load()
+            return
+        for event in events:
+            self._apply(event)
+
+    def _apply(self, event: dict):
+        transaction = str(event["transaction_id"])
+        if event["event"] == QUEUED:
+            self.queue[transaction] = None
+        elif event["event"] == DECIDED:
+            self.queue.pop(transaction, None)
+            self.history.append(
+                {
+                    "transaction_id": transaction,
+                    "decision": int(float(event["decision"])),
+                }
+            )
+
+    def _record(self, events: List[dict]):
+        with self.lock:
+            self.log.append(events)
+            for event in events:
+                self._apply(event)
+            if self.log.should_compact(len(self.queue) + len(self.history)):
+                self.compact()
+
+    def add(self, transactions: Iterable[str]) -> List[str]:
+        """
+        Queues the transactions that are not already waiting for review.
+
+        Returns:
+            The transactions actually added.
+        """
+        with self.lock:
+            self._refresh()
+            added = [
+                transaction
+                for transaction in dict.fromkeys(str(t) for t in transactions)
+                if transaction not in self.queue
+            ]
+            self._record(
+                [
+                    {"event": QUEUED, "transaction_id": t, "decision": None}
+                    for t in added
+                ]
+            )
+        return added
+
+    def decide(self, decisions: Dict[str, int]) -> List[str]:
+        """
+        Moves the queued transactions to the history with their decision.
+
+        Returns:
+            The transactions actually decided.
+        """
+        with self.lock:
+            self._refresh()
+            decided = {
+                str(transaction): int(decision)
+                for transaction, decision in decisions.items()
+                if str(transaction) in self.queue
+            }
+            self._record(
+                [
+                    {"event": DECIDED, "transaction_id": t, "decision": decision}
+                    for t, decision in decided.items()
+                ]
+            )
+        return list(decided)
+
+    def compact(self):
+        with self.lock:
+            self._refresh()
+            self.queue_data_node.write(list(self.queue))
+            self.history_data_node.write(self.history)
+            self._snapshot_signature = self._snapshot_files()
+            self.log.truncate()
+
+    def transactions_to_analyze(self) -> List[str]:
+        with self.lock:
+            self._refresh()
+            return list(self.queue)
+
+    def historical_transactions(self) -> List[dict]:
+        with self.lock:
+            self._refresh()
+            return list(self.history)
@@ -1,6 +1,6 @@
 import pandas as pd
 import datetime as dt
-from typing import List
+from typing import Dict, List, Set
 import uuid
 
 
@@ -14,6 +14,9 @@ from taipy.core.notification import (
     Notifier,
 )
 
+from .newsfeed_store import NewsfeedStore, NEWSFEED_EVENT_COLUMNS
+from .review_queue import ReviewQueue, REVIEW_EVENT_COLUMNS
+
 
 Config.configure_job_executions(mode="standalone", max_nb_of_workers=2)
 
@@ -37,6 +40,12 @@ newsfeed_cfg = Config.configure_data_node(
     },
 )
 
+newsfeed_events_cfg = Config.configure_data_node(
+    id="newsfeed_events",
+    storage_type="csv",
+    default_data={column: [] for column in NEWSFEED_EVENT_COLUMNS},
+)
+
 
 historical_transactions_cfg = Config.configure_data_node(
     id="historical_transactions",
@@ -61,143 +70,212 @@ transactions_to_analyze_cfg = Config.configure_data_node(
     ],
 )
 
+review_journal_cfg = Config.configure_data_node(
+    id="review_journal",
+    storage_type="csv",
+    default_data={column: [] for column in REVIEW_EVENT_COLUMNS},
+)
+
 
 user_cfg = Config.configure_scenario(
     id="user_info",
     additional_data_node_configs=[
         transactions_to_analyze_cfg,
         historical_transactions_cfg,
+        review_journal_cfg,
         newsfeed_cfg,
+        newsfeed_events_cfg,
     ],
 )
 
 
 Config.export("config/config.toml")
 
+# Named groups of users a transaction can be escalated to
+teams: Dict[str, List[str]] = {
+    "Fraud Team": ["Florian", "Alexandre", "Vincent"],
+}
+
+# One scenario, materialized newsfeed and review queue per user,
+# shared by every session of the process. The workers of serve.py keep their own
+# copies, brought up to date with the event logs before each access
+user_scenarios: Dict[str, Scenario] = {}
+newsfeed_stores: Dict[str, NewsfeedStore] = {}
+review_queues: Dict[str, ReviewQueue] = {}
+
+
+def resolve_receivers(receivers: List[str], sender: str = None) -> List[str]:
+    """
+    Expands the team names of a list of receivers into their members.
+
+    Args:
+        - receivers: usernames and team names
+        - sender: username left out of the teams the sender belongs to
+
+    Returns:
+        - the usernames, without duplicates, in the order they were given
+    """
+    usernames = []
+    for receiver in receivers:
+        if receiver in teams:
+            usernames += [member for member in teams[receiver] if member != sender]
+        else:
+            usernames.append(receiver)
+    return list(dict.fromkeys(usernames))
+
 
 class User:
     def __init__(self, username: str, state_id: str = None):
         self.username: str = username
 
-        users: List[Scenario] = [
-            s for s in tp.get_scenarios() if s.name == self.username
-        ]
-        if len(users) == 0:
-            self.user_info = tp.create_scenario(user_cfg, name=self.username)
-        else:
-            self.user_info = users[0]
+        if self.username not in user_scenarios:
+            for scenario in tp.get_scenarios():
+                user_scenarios.setdefault(scenario.name, scenario)
+        if self.username not in user_scenarios:
+            user_scenarios[self.username] = tp.create_scenario(
+                user_cfg, name=self.username
+            )
+        self.user_info = user_scenarios[self.username]
+
+    @property
+    def review_queue(self) -> ReviewQueue:
+        if self.username not in review_queues:
+            review_queues[self.username] = ReviewQueue(
+                self.user_info.transactions_to_analyze,
+                self.user_info.historical_transactions,
+                self.user_info.review_journal,
+            )
+        return review_queues[self.username]
 
     def get_transactions_to_analyze(self) -> List[str]:
-        return self.user_info.transactions_to_analyze.read()
+        return self.review_queue.transactions_to_analyze()
 
-    def write_transactions_to_analyze(self, transactions_to_analyze):
-        self.user_info.transactions_to_analyze.write(transactions_to_analyze)
+    def get_historical_transactions(self) -> List[dict]:
+        return self.review_queue.historical_transactions()
 
-    def get_newsfeed(self) -> pd.DataFrame:
-        return self.user_info.newsfeed.read()
+    @property
+    def newsfeed_store(self) -> NewsfeedStore:
+        if self.username not in newsfeed_stores:
+            newsfeed_stores[self.username] = NewsfeedStore(
+                self.user_info.newsfeed, self.user_info.newsfeed_events
+            )
+        # Pruned with the last session of the user
+        newsfeed_owners[self.user_info.newsfeed_events.id] = self.username
+        return newsfeed_stores[self.username]
 
-    def write_newsfeed(self, newsfeed):
-        newsfeed["timestamp"] = pd.to_datetime(newsfeed["timestamp"]).apply(
-            lambda x: x.strftime("%Y-%m-%dT%H:%M:%S")
-        )
-        self.user_info.newsfeed.write(newsfeed)
+    def get_newsfeed(self) -> pd.DataFrame:
+        return self.newsfeed_store.to_frame()
 
     def add_transaction_to_analyze(self, transaction):
-        transactions_to_analyze = self.get_transactions_to_analyze()
-        if transaction in transactions_to_analyze:
-            return
-        transactions_to_analyze.append(transaction)
-        self.write_transactions_to_analyze(transactions_to_analyze)
+        self.add_transactions_to_analyze([transaction])
 
-    def remove_transaction_to_analyze(self, transaction, decision=0):
-        transactions_to_analyze = self.get_transactions_to_analyze()
-        historical_transactions = self.user_info.historical_transactions.read()
-        if transaction not in transactions_to_analyze:
-            return
-        transactions_to_analyze.remove(transaction)
+    def add_transactions_to_analyze(self, transactions: List[str]):
+        self.review_queue.add(transactions)
 
-        historical_transactions.append(
-            {"transaction_id": transaction, "decision": decision}
-        )
+    def remove_transaction_to_analyze(self, transaction, decision=0):
+        self.decide_transactions({transaction: decision})
 
-        self.user_info.historical_transactions.write(historical_transactions)
-        self.write_transactions_to_analyze(transactions_to_analyze)
+    def decide_transactions(self, decisions: Dict[str, int]):
+        self.review_queue.decide(decisions)
 
     def share_transaction(
         self, transaction_number: str, receiver_username: str, comment: str
     ):
-        news = pd.DataFrame(
-            {
-                "news_id": [str(uuid.uuid4())],
-                "sender_username": [self.username],
-                "receiver_username": [receiver_username],
-                "message": [comment],
-                "metadata": [transaction_number],
-                "message_type": ["Transaction"],
-                "timestamp": [dt.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")],
-                "unseen": [True],
-            }
-        )
-        User(receiver_username).add_to_newsfeed(news)
+        self.share_transactions([transaction_number], [receiver_username], comment)
 
-    def add_to_newsfeed(self, news: pd.DataFrame):
-        newsfeed = self.get_newsfeed()
-        newsfeed = pd.concat([newsfeed, news], ignore_index=True)
-        newsfeed["timestamp"] = pd.to_datetime(
-            newsfeed["timestamp"], format="%Y-%m-%dT%H:%M:%S"
-        )
-        self.write_newsfeed(newsfeed)
-
-
-"""
-def notify_user(state, data_node):
-    if data_node.config_id == "uploaded_file":
-        pass
-    elif data_node.config_id == "clean_uploaded_file":
-        state.clean_data_dn = data_node
-        state.logs += "Cleaned file loaded.\n"
-        state.logs += f"Waiting to compare {len(data_node.read())} rates to the existing database...\n"
-    elif data_node.config_id == "rates_not_included":
-        state.rates_not_included = data_node.read()
-        if not state.rates_not_included.empty:
-            error_messages = "\n".join(
-                f"    Error in sheet '{row['SheetName']}'"
-                for index, row in state.rates_not_included.iterrows()
+    def share_transactions(
+        self, transaction_numbers: List[str], receivers: List[str], comment: str
+    ) -> List[str]:
+        """
+        Sends transactions to users and teams, with one newsfeed write per receiver.
+
+        Returns:
+            The usernames the transactions were sent to.
+        """
+        timestamp = dt.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        receiver_usernames = resolve_receivers(receivers, sender=self.username)
+        for receiver_username in receiver_usernames:
+            news = pd.DataFrame(
+                {
+                    "news_id": [str(uuid.uuid4()) for _ in transaction_numbers],
+                    "sender_username": self.username,
+                    "receiver_username": receiver_username,
+                    "message": comment,
+                    "metadata": transaction_numbers,
+                    "message_type": "Transaction",
+                    "timestamp": timestamp,
+                    "unseen": True,
+                }
             )
-        else:
-            error_messages = ""
-        state.logs += f"{error_messages}\n"
-    elif data_node.config_id == "compared_rates":
-        state.logs += "Rebasing the results...\n"
-    elif data_node.config_id == "rebased_compared_rates":
-        state.rebased_compared_rates = data_node.read()
-        state.logs = ""
-        state.rebased_compared_rates_path = data_node.path
-        notify(state, "success", "Comparison complete.")
-
-
-class SpecificCoreConsumer(CoreEventConsumerBase):
-    def __init__(self, gui):
+            User(receiver_username).add_to_newsfeed(news)
+        return receiver_usernames
+
+    def add_to_newsfeed(self, news: pd.DataFrame):
+        self.newsfeed_store.add(news.to_dict("records"))
+
+
+# Open sessions of each user, by Taipy state id
+user_sessions: Dict[str, Set[str]] = {}
+# Owner of each newsfeed event log, by data node id
+newsfeed_owners: Dict[str, str] = {}
+
+
+def register_session(username: str, state_id: str):
+    for state_ids in user_sessions.values():
+        state_ids.discard(state_id)
+    user_sessions.setdefault(username, set()).add(state_id)
+    for other in [name for name, state_ids in user_sessions.items() if not state_ids]:
+        del user_sessions[other]
+
+
+def prune_sessions(gui):
+    """
+    Forgets the sessions whose state Taipy removed, once their client disconnected
+    for longer than the state_retention_period of the Gui
+    """
+    # Taipy has no public list of the live states, nor a disconnection callback
+    live_state_ids = gui._get_all_data_scopes().keys()
+    for username in list(user_sessions):
+        user_sessions[username] &= live_state_ids
+        if not user_sessions[username]:
+            del user_sessions[username]
+    for data_node_id, username in list(newsfeed_owners.items()):
+        if username not in user_sessions:
+            del newsfeed_owners[data_node_id]
+
+
+class NewsfeedConsumer(CoreEventConsumerBase):
+    def __init__(self, gui, callback):
+        """
+        Pushes newsfeed changes to the open sessions of the receiving user.
+
+        Parameters:
+            gui (Gui): The running Taipy GUI.
+            callback (Callable): Called as `callback(state, username)` in each
+                session of the user whose newsfeed changed.
+        """
         self.gui = gui
-        reg_id, queue = (
-            Notifier.register()
-        )  # Adapt the registration to the events you want to listen to
+        self.callback = callback
+        # A write emits one event per updated attribute, deliver each change once
+        self.delivered_versions: Dict[str, int] = {}
+        reg_id, queue = Notifier.register(
+            entity_type=EventEntityType.DATA_NODE,
+            operation=EventOperation.UPDATE,
+        )
         super().__init__(reg_id, queue)
 
     def process_event(self, event):
-        # with Authorize(login(ADMIN, ADMIN)):
-        if (
-            event.entity_type == EventEntityType.JOB
-            and event.operation == EventOperation.UPDATE
-        ):
-            if (
-                event.attribute_name == "status"
-                and event.attribute_value == Status.COMPLETED
-            ):
-                task = tp.get(event.entity_id).task
-                for data_node in task.output.values():
-                    try:
-                        self.gui.broadcast_callback(notify_user, [data_node])
-                    except Exception as e:
-                        print(e)
-"""
\ No newline at end of file
+        username = newsfeed_owners.get(event.entity_id)
+        if username is None or username not in newsfeed_stores:
+            return
+        version = newsfeed_stores[username].version
+        if self.delivered_versions.get(username) == version:
+            return
+        self.delivered_versions[username] = version
+        # invoke_callback would create a new state for a removed one
+        prune_sessions(self.gui)
+        for state_id in list(user_sessions.get(username, ())):
+            try:
+                invoke_callback(self.gui, state_id, self.callback, [username])
+            except Exception as e:
+                print(e)
@@ -1,21 +1,28 @@
+import os
 import pandas as pd
 import random
 from .preprocess_data import get_all_images_with_folders
+from .key_index import KeyIndex
+from .date_index import DateIndex
+from .explanation_store import EXPLANATIONS_PATH, open_explanations, write_explanations
+from .scoring import DATE_FORMAT, score_transactions, validate_window
+import hashlib
 import pickle
+from typing import TYPE_CHECKING
 
-from shap import Explainer, Explanation
-
-import xgboost as xgb
 import datetime as dt
 
 from taipy.gui import notify
 from state_class import State
 
+if TYPE_CHECKING:
+    import xgboost as xgb
+
 
 def generate_transactions(
     state: State,
     df: pd.DataFrame,
-    model: xgb.XGBRegressor,
+    model: "xgb.XGBRegressor",
     threshold: float,
     start_date="2020-06-21",
     end_date="2030-01-01",
@@ -32,187 +39,214 @@ def generate_transactions(
         - end_date: the end date of the transactions
 
     Returns:
-        - a DataFrame of transactions with the fraud prediction
+        - a DataFrame of transactions with the fraud prediction, and the
+          features of the model for each of them
     """
-    start_date = str(start_date)
-    end_date = str(end_date)
-    start_date_dt = dt.datetime.strptime(start_date, "%Y-%m-%d")
-    end_date_dt = dt.datetime.strptime(end_date, "%Y-%m-%d")
-    # Make sure the dates are separated by at least one day
-    if (end_date_dt - start_date_dt).days < 1:
-        notify(state, "error", "The start date must be before the end date")
-        raise Exception("The start date must be before the end date")
-    # Make sure that start_date is between 2020-06-21 and 2020-06-30
-    if not (dt.datetime(2020, 6, 21) <= start_date_dt <= dt.datetime(2020, 6, 30)):
-        notify(
-            state, "error", "The start date must be between 2020-06-21 and 2020-06-30"
-        )
-        raise Exception("The start date must be between 2020-06-21 and 2020-06-30")
-    df["age"] = dt.date.today().year - pd.to_datetime(df["dob"]).dt.year
-    df["hour"] = pd.to_datetime(df["trans_date_trans_time"]).dt.hour
-    df["day"] = pd.to_datetime(df["trans_date_trans_time"]).dt.dayofweek
-    df["month"] = pd.to_datetime(df["trans_date_trans_time"]).dt.month
-    test = df[
-        [
-            "category",
-            "amt",
-            "zip",
-            "city_pop",
-            "age",
-            "hour",
-            "day",
-            "month",
-            "is_fraud",
-        ]
-    ]
-    test = pd.get_dummies(test, drop_first=True)
-    test = test[df["trans_date_trans_time"].between(str(start_date), str(end_date))]
+    start_date_dt = dt.datetime.strptime(str(start_date), DATE_FORMAT)
+    try:
+        validate_window(start_date, end_date)
+        # Make sure that start_date is between 2020-06-21 and 2020-06-30
+        if not (dt.datetime(2020, 6, 21) <= start_date_dt <= dt.datetime(2020, 6, 30)):
+            raise ValueError("The start date must be between 2020-06-21 and 2020-06-30")
+    except ValueError as error:
+        notify(state, "error", str(error))
+        raise
 
-    X_test = test.drop("is_fraud", axis="columns")
-    X_test_values = X_test.values
-
-    transactions = df[
-        df["trans_date_trans_time"].between(str(start_date), str(end_date))
-    ]
-    raw_results = model.predict(X_test_values)
-    results = [str(min(1, round(result, 2))) for result in raw_results]
-    transactions.insert(0, "fraud_value", results)
-    # Low if under 0.2, Medium if under 0.5, High if over 0.5
-    results = ["Low" if float(result) < 0.2 else "Medium" for result in raw_results]
-    for i, result in enumerate(results):
-        if result == "Medium" and float(raw_results[i]) > 0.5:
-            results[i] = "High"
-    transactions.insert(0, "Fraud Confidence", results)
-    results = [float(result) > threshold for result in raw_results]
-    transactions.insert(0, "Fraud", results)
-
-    explainer = Explainer(model)
-    sv = explainer(X_test)
-    explanation = Explanation(sv, sv.base_values, X_test, feature_names=X_test.columns)
-    # Drop Unnamed: 0 column if it exists
-    if "Unnamed: 0" in transactions.columns:
-        transactions = transactions.drop(columns=["Unnamed: 0"])
-    return transactions, explanation
+    return score_transactions(df, model, threshold, start_date, end_date)
 
 
 PATH_TO_TRAINING_DATASET = "data/trainset/"
-PATH_TO_DATA = "data/fraud_data.csv"
+# Overridden to run the app or the benchmarks on another dataset
+PATH_TO_DATA = os.environ.get("FRAUD_DATA_PATH", "data/fraud_data.csv")
+PATH_TO_CLIENTS = os.environ.get("FRAUD_CLIENTS_PATH", "data/clients.csv")
+
+# Set to load the days of a partitioned store, see data/partitioned_store.py,
+# between the optional FRAUD_LOAD_START and the excluded FRAUD_LOAD_END
+PATH_TO_STORE = os.environ.get("FRAUD_STORE_PATH")
+LOAD_START_DATE = os.environ.get("FRAUD_LOAD_START")
+LOAD_END_DATE = os.environ.get("FRAUD_LOAD_END")
 
-images_dict = get_all_images_with_folders(PATH_TO_TRAINING_DATASET)
 threshold = "0.5"
+# Set by the GUI workers to attach to the dataset published by
+# python -m data.shared_dataset instead of loading their own copy
+SHARED_DATASET_PATH = os.environ.get("FRAUD_SHARED_DATASET")
 
 with open("model.pkl", "rb") as model:
-    model = pickle.load(model)
-
-
-data = pd.read_csv(PATH_TO_DATA)
-
-data["trans_num"] = data["trans_num"].apply(lambda x: x[:8])
-data["cc_num"] = data["cc_num"].apply(lambda x: int(str(x)[:8]))
-
-data, explanation = generate_transactions(None, data, model, float(threshold))
-# Read the data and select relevant columns
-
-
-data = data[
-    [
-        "first",
-        "last",
-        "gender",
-        "street",
-        "city",
-        "state",
-        "zip",
-        "lat",
-        "long",
-        "city_pop",
-        "job",
-        "is_fraud",
-        "trans_num",
-        "trans_date_trans_time",
-        "cc_num",
-        "merchant",
-        "category",
-        "amt",
-        "Fraud",
-        "fraud_value",
-        "Fraud Confidence",
-        "age",
-        "hour",
-        "day",
-    ]
-]
-
-# Rename columns for better readability
-data.rename(
-    columns={
-        "first": "First Name",
-        "last": "Last Name",
-        "gender": "Gender",
-        "street": "Street Address",
-        "city": "City",
-        "state": "State",
-        "zip": "ZIP Code",
-        "lat": "Latitude",
-        "long": "Longitude",
-        "city_pop": "City Population",
-        "job": "Job Title",
-        "trans_num": "Transaction Number",
-        "cc_num": "Credit Card Number",
-        "merchant": "Merchant",
-        "category": "Category",
-        "amt": "Amount",
-        "age": "Age",
-        "hour": "Hour",
-        "day": "Day",
-        "fraud_value": "Fraud Value",
-    },
-    inplace=True,
-)
-
-data["Client"] = data.apply(
-    lambda row: row["First Name"] + " " + row["Last Name"], axis=1
-)
-
-data_transaction = data[
-    [
-        "Fraud",
-        "Fraud Confidence",
-        "Client",
-        "Amount",
-        "Category",
-        "Merchant",
-        "Transaction Number",
-        "Credit Card Number",
-        "trans_date_trans_time",
-        "is_fraud",
-        "Fraud Value",
+    model_bytes = model.read()
+model = pickle.loads(model_bytes)
+# Part of the dataset version: the scores and explanations of another model differ
+model_version = hashlib.sha256(model_bytes).hexdigest()[:16]
+del model_bytes
+
+
+def load_data():
+    """
+    Loads, scores and splits the dataset
+
+    Returns:
+        - the transactions with the client columns, their features,
+          the transactions, the clients, and the version of the dataset
+    """
+    images_dict = get_all_images_with_folders(PATH_TO_TRAINING_DATASET)
+
+    # Sorted by date, so that every date window is a slice of the rows.
+    # The version identifies the loaded dataset in the caches of derived results
+    if PATH_TO_STORE:
+        from .partitioned_store import load_transactions, store_version
+
+        data = load_transactions(PATH_TO_STORE, LOAD_START_DATE, LOAD_END_DATE)
+        if len(data) == 0:
+            raise ValueError(
+                f"No transactions in {PATH_TO_STORE} from {LOAD_START_DATE} "
+                f"to {LOAD_END_DATE}, check FRAUD_LOAD_START and FRAUD_LOAD_END"
+            )
+        dataset_version = store_version(PATH_TO_STORE, LOAD_START_DATE, LOAD_END_DATE)
+    else:
+        data = pd.read_csv(PATH_TO_DATA).sort_values(
+            "trans_date_trans_time", kind="stable", ignore_index=True
+        )
+        dataset_version = f"{PATH_TO_DATA}:{os.path.getmtime(PATH_TO_DATA)}"
+    dataset_version += f":{len(data)}:model={model_version}"
+
+    data["trans_num"] = data["trans_num"].apply(lambda x: x[:8])
+    data["cc_num"] = data["cc_num"].apply(lambda x: int(str(x)[:8]))
+
+    data, features = generate_transactions(None, data, model, float(threshold))
+    # Read the data and select relevant columns
+
+    data = data[
+        [
+            "first",
+            "last",
+            "gender",
+            "street",
+            "city",
+            "state",
+            "zip",
+            "lat",
+            "long",
+            "city_pop",
+            "job",
+            "is_fraud",
+            "trans_num",
+            "trans_date_trans_time",
+            "cc_num",
+            "merchant",
+            "category",
+            "amt",
+            "Fraud",
+            "fraud_value",
+            "Fraud Confidence",
+            "age",
+            "hour",
+            "day",
+        ]
     ]
-].reset_index(drop=True)
 
-data_clients = (
-    data[
+    # Rename columns for better readability
+    data.rename(
+        columns={
+            "first": "First Name",
+            "last": "Last Name",
+            "gender": "Gender",
+            "street": "Street Address",
+            "city": "City",
+            "state": "State",
+            "zip": "ZIP Code",
+            "lat": "Latitude",
+            "long": "Longitude",
+            "city_pop": "City Population",
+            "job": "Job Title",
+            "trans_num": "Transaction Number",
+            "cc_num": "Credit Card Number",
+            "merchant": "Merchant",
+            "category": "Category",
+            "amt": "Amount",
+            "age": "Age",
+            "hour": "Hour",
+            "day": "Day",
+            "fraud_value": "Fraud Value",
+        },
+        inplace=True,
+    )
+
+    data["Client"] = data.apply(
+        lambda row: row["First Name"] + " " + row["Last Name"], axis=1
+    )
+
+    data_transaction = data[
         [
-            "First Name",
-            "Last Name",
-            "Gender",
-            "Street Address",
+            "Fraud",
+            "Fraud Confidence",
             "Client",
-            "City",
-            "State",
-            "ZIP Code",
-            "Job Title",
-            "Age",
-            "Latitude",
-            "Longitude",
-            "City Population",
+            "Amount",
+            "Category",
+            "Merchant",
+            "Transaction Number",
+            "Credit Card Number",
+            "trans_date_trans_time",
+            "is_fraud",
+            "Fraud Value",
         ]
-    ]
-    .groupby(by=["Client"])
-    .first()
-    .reset_index(drop=False)
-)
-
-# Generate a random age for each client (range 18-75)
-data_clients["Photo"] = list(images_dict.values())[: len(data_clients)]
-data_clients.to_csv("data/clients.csv", index=False)
\ No newline at end of file
+    ].reset_index(drop=True)
+
+    data_clients = (
+        data[
+            [
+                "First Name",
+                "Last Name",
+                "Gender",
+                "Street Address",
+                "Client",
+                "City",
+                "State",
+                "ZIP Code",
+                "Job Title",
+                "Age",
+                "Latitude",
+                "Longitude",
+                "City Population",
+            ]
+        ]
+        .groupby(by=["Client"])
+        .first()
+        .reset_index(drop=False)
+    )
+
+    # Generate a random age for each client (range 18-75)
+    # Photos are reused when there are more clients than photos
+    photos = list(images_dict.values())
+    data_clients["Photo"] = [photos[i % len(photos)] for i in range(len(data_clients))]
+    data_clients.to_csv(PATH_TO_CLIENTS, index=False)
+
+    return data, features, data_transaction, data_clients, dataset_version
+
+
+if SHARED_DATASET_PATH:
+    from .shared_dataset import attach_dataset
+
+    dataset_version, frames = attach_dataset(SHARED_DATASET_PATH)
+    data = frames["data"]
+    data_transaction = frames["data_transaction"]
+    data_clients = frames["data_clients"]
+    # Written with the dataset by the loader
+    explanation = open_explanations(dataset_version, EXPLANATIONS_PATH)
+    if explanation is None:
+        raise FileNotFoundError(
+            f"No explanations of {dataset_version} in {EXPLANATIONS_PATH}"
+        )
+else:
+    data, features, data_transaction, data_clients, dataset_version = load_data()
+    # Explained once per dataset version, then memory-mapped by row
+    explanation = open_explanations(
+        dataset_version, EXPLANATIONS_PATH
+    ) or write_explanations(features, model, dataset_version)
+    # Only the explanations are kept
+    del features
+
+# Row positions by key, shared by every lookup of a transaction or a client.
+# data and data_transaction have the same row order, sorted by date.
+transaction_index = KeyIndex(data["Transaction Number"])
+client_transaction_index = KeyIndex(data["Client"])
+client_index = KeyIndex(data_clients["Client"])
+date_index = DateIndex(data["trans_date_trans_time"])
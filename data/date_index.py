@@ -0,0 +1,64 @@
+""" Date windows of a date-sorted DataFrame, found by binary search """
+
+import datetime as dt
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class DateIndex:
+    def __init__(self, dates: pd.Series):
+        """
+        Positions of the rows of a DataFrame sorted by date.
+
+        A window is the slice between two binary searches, O(log n) instead of a
+        comparison of every date. The positions are valid for every DataFrame
+        sharing the row order of `dates`.
+
+        Parameters:
+            dates (pd.Series): The sorted dates, e.g. data["trans_date_trans_time"].
+        """
+        self.dates = pd.to_datetime(dates).to_numpy(dtype="datetime64[ns]")
+        if np.any(self.dates[1:] < self.dates[:-1]):
+            raise ValueError("The dates must be sorted")
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _check_not_empty(self):
+        if len(self.dates) == 0:
+            raise ValueError("There are no transactions, the window has no days")
+
+    @property
+    def first_day(self) -> dt.date:
+        self._check_not_empty()
+        return pd.Timestamp(self.dates[0]).date()
+
+    @property
+    def last_day(self) -> dt.date:
+        self._check_not_empty()
+        return pd.Timestamp(self.dates[-1]).date()
+
+    def bounds(self, start_date, end_date) -> Tuple[int, int]:
+        """
+        Returns the positions of the first row from start_date and of the first
+        row from end_date, end_date is excluded
+
+        Args:
+            - start_date: the start of the window, a date or an ISO string
+            - end_date: the end of the window, a date or an ISO string
+        """
+        start = np.datetime64(pd.Timestamp(start_date), "ns")
+        end = np.datetime64(pd.Timestamp(end_date), "ns")
+        return (
+            int(np.searchsorted(self.dates, start, side="left")),
+            int(np.searchsorted(self.dates, end, side="left")),
+        )
+
+    def window(self, df: pd.DataFrame, start_date, end_date) -> pd.DataFrame:
+        """
+        Returns the rows of the window, a view of df keeping its index
+        """
+        start, stop = self.bounds(start_date, end_date)
+        return df.iloc[start:stop]
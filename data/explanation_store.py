@@ -0,0 +1,131 @@
+""" SHAP values of every transaction, written once and memory-mapped by row """
+
+import json
+import os
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .scoring import explain_transactions
+
+# Overridden to keep the explanations of several datasets
+EXPLANATIONS_PATH = os.environ.get("FRAUD_EXPLANATIONS_PATH", "data/explanations")
+MANIFEST_FILE = "manifest.json"
+# Rows explained at once while writing
+CHUNK_ROWS = 100_000
+
+
+class RowExplanation(NamedTuple):
+    # The SHAP value of each feature
+    values: np.ndarray
+    base_values: float
+    # The value of each feature
+    data: np.ndarray
+
+
+class ExplanationStore:
+    def __init__(self, path: str, manifest: dict):
+        """
+        The SHAP values and the features of every row, as float32 matrices mapped
+        read-only. Only the pages of the rows read are loaded, and they are shared
+        by every process of the host through the page cache.
+
+        Parameters:
+            path (str): The directory of the matrices.
+            manifest (dict): The manifest of the matrices.
+        """
+        self.version = manifest["version"]
+        self.features = manifest["features"]
+        rows, columns = manifest["rows"], len(self.features)
+        # The base value is the last column of the SHAP values
+        self.values = np.memmap(
+            os.path.join(path, manifest["files"]["values"]),
+            dtype=np.float32,
+            mode="r",
+            shape=(rows, columns + 1),
+        )
+        self.data = np.memmap(
+            os.path.join(path, manifest["files"]["data"]),
+            dtype=np.float32,
+            mode="r",
+            shape=(rows, columns),
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, row: int) -> RowExplanation:
+        values = self.values[row]
+        return RowExplanation(values[:-1], float(values[-1]), self.data[row])
+
+
+def open_explanations(
+    version: str, path: str = EXPLANATIONS_PATH
+) -> Optional[ExplanationStore]:
+    """
+    Returns the explanations of a version of the dataset, None if they are not
+    written
+    """
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+    if manifest["version"] != version:
+        return None
+    return ExplanationStore(path, manifest)
+
+
+def write_explanations(
+    features: pd.DataFrame, model, version: str, path: str = EXPLANATIONS_PATH
+) -> ExplanationStore:
+    """
+    Explains every row chunk by chunk into the files of the store, replaces
+    the previous explanations once complete and opens them
+
+    Args:
+        - features: the features of the predicted transactions
+        - model: the model used to predict the fraud
+        - version: the version of the dataset
+        - path: the directory of the matrices
+    """
+    os.makedirs(path, exist_ok=True)
+    rows, columns = features.shape
+    files = {"values": "values.f32", "data": "data.f32"}
+    # Processes mapping the previous files keep them until they unmap them
+    suffix = f".{os.getpid()}.tmp"
+    values = np.memmap(
+        os.path.join(path, files["values"] + suffix),
+        dtype=np.float32,
+        mode="w+",
+        shape=(max(rows, 1), columns + 1),
+    )
+    data = np.memmap(
+        os.path.join(path, files["data"] + suffix),
+        dtype=np.float32,
+        mode="w+",
+        shape=(max(rows, 1), columns),
+    )
+    for start in range(0, rows, CHUNK_ROWS):
+        chunk = features.iloc[start : start + CHUNK_ROWS]
+        values[start : start + len(chunk)] = explain_transactions(chunk, model)
+        data[start : start + len(chunk)] = chunk.to_numpy(dtype=np.float32)
+    values.flush()
+    data.flush()
+    del values, data
+    for file in files.values():
+        os.replace(os.path.join(path, file + suffix), os.path.join(path, file))
+
+    # Readers open the files listed by the manifest, written last
+    manifest = {
+        "version": version,
+        "rows": rows,
+        "features": list(features.columns),
+        "files": files,
+    }
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    with open(manifest_path + suffix, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(manifest_path + suffix, manifest_path)
+    return ExplanationStore(path, manifest)
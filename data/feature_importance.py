@@ -0,0 +1,100 @@
+""" Mean absolute SHAP value of every feature, overall and by segment """
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+# Columns of the scored transactions the importance is broken down by
+SEGMENTATIONS = ["Category", "State", "Fraud Confidence"]
+# Rows of the explanation matrix read at once
+CHUNK_ROWS = 100_000
+
+
+class FeatureImportance:
+    def __init__(
+        self, features: List[str], segmentations: Iterable[str] = SEGMENTATIONS
+    ):
+        """
+        Sums of the absolute SHAP values of the features, overall and by segment.
+        Rows are added by batches, so the importance is updated with new scored
+        rows without reading the previous ones again.
+
+        Parameters:
+            features (list): The names of the features, in the order of the values.
+            segmentations (list): The names of the segment columns.
+        """
+        self.features = list(features)
+        self.count = 0
+        self.sums = np.zeros(len(self.features))
+        self.segment_counts = {
+            name: pd.Series(dtype=np.int64) for name in segmentations
+        }
+        self.segment_sums = {
+            name: pd.DataFrame(columns=self.features, dtype=np.float64)
+            for name in segmentations
+        }
+
+    def add(self, values: np.ndarray, segments: Dict[str, Iterable]):
+        """
+        Adds a batch of rows
+
+        Args:
+            - values: the SHAP values of the rows, one column per feature
+            - segments: the segment of each row, by segmentation
+        """
+        values = np.abs(np.asarray(values, dtype=np.float64))
+        self.count += len(values)
+        self.sums += values.sum(axis=0)
+        frame = pd.DataFrame(values, columns=self.features)
+        for name in self.segment_sums:
+            labels = np.asarray(segments[name])
+            grouped = frame.groupby(labels, sort=False)
+            self.segment_sums[name] = self.segment_sums[name].add(
+                grouped.sum(), fill_value=0
+            )
+            self.segment_counts[name] = self.segment_counts[name].add(
+                grouped.size(), fill_value=0
+            )
+
+    def importance(self) -> pd.DataFrame:
+        """
+        Returns the Feature and its Importance, the most important first
+        """
+        importance = pd.DataFrame(
+            {"Feature": self.features, "Importance": self.sums / max(self.count, 1)}
+        )
+        return importance.sort_values("Importance", ascending=False, ignore_index=True)
+
+    def segment_importance(self, segmentation: str) -> pd.DataFrame:
+        """
+        Returns the importance of every feature in every segment, one row per
+        segment, the features in the order of their overall importance
+        """
+        importance = self.segment_sums[segmentation].div(
+            self.segment_counts[segmentation], axis=0
+        )
+        importance = importance[self.importance()["Feature"]].sort_index()
+        return importance.rename_axis(segmentation)
+
+
+def compute_feature_importance(
+    values: np.ndarray, segments: pd.DataFrame, features: List[str]
+) -> FeatureImportance:
+    """
+    Reduces the explanation matrix chunk by chunk, a memory-mapped matrix is
+    read once and never loaded whole
+
+    Args:
+        - values: the SHAP values of every row, extra columns are ignored
+        - segments: the segment columns of every row, in the same order
+        - features: the names of the features
+    """
+    feature_importance = FeatureImportance(features, segments.columns)
+    for start in range(0, len(values), CHUNK_ROWS):
+        stop = start + CHUNK_ROWS
+        feature_importance.add(
+            values[start:stop, : len(features)],
+            {name: segments[name].iloc[start:stop] for name in segments.columns},
+        )
+    return feature_importance
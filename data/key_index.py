@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+
+class KeyIndex:
+    def __init__(self, keys: pd.Series):
+        """
+        Positions of the rows of a DataFrame, by the value of one of its columns.
+
+        Built once in O(n), each lookup is then O(1) instead of a scan of the column.
+        The positions are valid for every DataFrame sharing the row order of `keys`.
+
+        Parameters:
+            keys (pd.Series): The key column, e.g. data["Transaction Number"].
+        """
+        keys = keys.reset_index(drop=True)
+        self.positions = keys.groupby(keys, sort=False).indices
+
+    def __contains__(self, key) -> bool:
+        return key in self.positions
+
+    def get(self, key) -> np.ndarray:
+        return self.positions.get(key, np.empty(0, dtype=np.intp))
+
+    def get_many(self, keys) -> np.ndarray:
+        positions = [self.get(key) for key in keys]
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(positions)
+
+    def first(self, key) -> int:
+        return int(self.positions[key][0])
+
+    def take(self, df: pd.DataFrame, key) -> pd.DataFrame:
+        return df.iloc[self.get(key)]
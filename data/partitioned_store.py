@@ -0,0 +1,183 @@
+""" On-disk store of the raw transactions, one Parquet file per day and per append
+
+Usage: python -m data.partitioned_store input.csv [--store data/store]
+       [--chunk-rows 1000000]
+
+The input file is appended to the store, the existing partitions are not rewritten.
+The app loads the store instead of data/fraud_data.csv when FRAUD_STORE_PATH is
+set, reading only the days between FRAUD_LOAD_START and FRAUD_LOAD_END if set.
+"""
+
+import argparse
+import json
+import os
+from typing import List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.event_log import ProcessLock
+
+STORE_PATH = "data/store"
+CATALOG_FILE = "catalog.json"
+LOCK_FILE = "store.lock"
+CHUNK_ROWS = 1_000_000
+DATE_COLUMN = "trans_date_trans_time"
+
+
+def read_catalog(path: str = STORE_PATH) -> dict:
+    """
+    Returns the catalog of the store, an empty one if the store does not exist
+
+    Returns:
+        - the version of the store, incremented by every append, and the
+          files, rows and time range of every day
+    """
+    try:
+        with open(os.path.join(path, CATALOG_FILE)) as catalog_file:
+            return json.load(catalog_file)
+    except FileNotFoundError:
+        return {"version": 0, "partitions": {}}
+
+
+def _write_catalog(catalog: dict, path: str):
+    catalog_path = os.path.join(path, CATALOG_FILE)
+    with open(catalog_path + ".tmp", "w") as catalog_file:
+        json.dump(catalog, catalog_file, indent=1, sort_keys=True)
+    os.replace(catalog_path + ".tmp", catalog_path)
+
+
+def _get_schema(catalog: dict, path: str):
+    for partition in catalog["partitions"].values():
+        return pq.read_schema(os.path.join(path, partition["files"][0]))
+    return None
+
+
+def append_transactions(df: pd.DataFrame, path: str = STORE_PATH) -> List[str]:
+    """
+    Writes the transactions as new files of the days they belong to.
+    Files are written before the catalog, a failed append leaves the store unchanged.
+    Appends to a store are serialized, also between processes
+
+    Args:
+        - df: the raw transactions, with the columns of data/fraud_data.csv
+        - path: the directory of the store
+
+    Returns:
+        - the days appended to
+    """
+    os.makedirs(path, exist_ok=True)
+    # Held from the read of the catalog to its replacement, so that concurrent
+    # appends neither number their files alike nor drop each other's partitions
+    with ProcessLock(os.path.join(path, LOCK_FILE)):
+        catalog = read_catalog(path)
+        # Columns keep the types of the first append
+        schema = _get_schema(catalog, path)
+        df = df.sort_values(DATE_COLUMN, kind="stable")
+        days = df[DATE_COLUMN].astype(str).str[:10]
+
+        for day, transactions in df.groupby(days, sort=True):
+            partition = catalog["partitions"].setdefault(
+                day, {"files": [], "rows": 0, "first": None, "last": None}
+            )
+            file = f"{day}/part-{len(partition['files']):04d}.parquet"
+            table = pa.Table.from_pandas(
+                transactions, schema=schema, preserve_index=False
+            )
+            schema = table.schema
+            os.makedirs(os.path.join(path, day), exist_ok=True)
+            pq.write_table(table, os.path.join(path, file), compression="zstd")
+
+            times = transactions[DATE_COLUMN].astype(str)
+            partition["files"].append(file)
+            partition["rows"] += len(transactions)
+            partition["first"] = min(filter(None, [partition["first"], times.iloc[0]]))
+            partition["last"] = max(filter(None, [partition["last"], times.iloc[-1]]))
+
+        catalog["version"] += 1
+        _write_catalog(catalog, path)
+    return sorted(days.unique())
+
+
+def select_partitions(catalog: dict, start_date=None, end_date=None) -> List[str]:
+    """
+    Returns the days of the store from start_date, end_date excluded, in order
+
+    Args:
+        - catalog: the catalog of the store
+        - start_date: the first day, the first day of the store if None
+        - end_date: the excluded end day, after the last day of the store if None
+    """
+    return [
+        day
+        for day in sorted(catalog["partitions"])
+        if (start_date is None or day >= str(start_date)[:10])
+        and (end_date is None or day < str(end_date)[:10])
+    ]
+
+
+def load_transactions(
+    path: str = STORE_PATH, start_date=None, end_date=None
+) -> pd.DataFrame:
+    """
+    Reads the transactions of the days of a window, sorted by date, without
+    opening the files of the other days
+
+    Args:
+        - path: the directory of the store
+        - start_date: the first day, the first day of the store if None
+        - end_date: the excluded end day, after the last day of the store if None
+    """
+    catalog = read_catalog(path)
+    files = [
+        os.path.join(path, file)
+        for day in select_partitions(catalog, start_date, end_date)
+        for file in catalog["partitions"][day]["files"]
+    ]
+    if not files:
+        schema = _get_schema(catalog, path)
+        if schema is None:
+            raise FileNotFoundError(f"No transactions in the store {path}")
+        return schema.empty_table().to_pandas()
+    table = pa.concat_tables(pq.read_table(file) for file in files)
+    # Files of one day appended separately may overlap in time
+    return table.to_pandas().sort_values(DATE_COLUMN, kind="stable", ignore_index=True)
+
+
+def store_version(path: str = STORE_PATH, start_date=None, end_date=None) -> str:
+    """
+    Identifies the transactions of a window, changes with every append
+    """
+    return f"{path}:{read_catalog(path)['version']}:{start_date}:{end_date}"
+
+
+def append_file(
+    input_path: str, path: str = STORE_PATH, chunk_rows: int = CHUNK_ROWS
+) -> List[str]:
+    """
+    Appends a CSV file of transactions to the store, chunk by chunk
+
+    Returns:
+        - the days appended to
+    """
+    days = set()
+    for chunk in pd.read_csv(input_path, chunksize=chunk_rows):
+        days.update(append_transactions(chunk, path))
+    return sorted(days)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    days = append_file(args.input, args.store, args.chunk_rows)
+    catalog = read_catalog(args.store)
+    print(
+        f"{len(days)} day(s) appended to {args.store}, "
+        f"{len(catalog['partitions'])} day(s) in the store, "
+        f"version {catalog['version']}"
+    )
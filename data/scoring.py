@@ -0,0 +1,170 @@
+""" Fraud scoring of raw transactions, independent of the GUI """
+
+import datetime as dt
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Features of the model, in the order it was trained with
+FEATURE_COLUMNS = [
+    "amt",
+    "zip",
+    "city_pop",
+    "age",
+    "hour",
+    "day",
+    "month",
+    "category_food_dining",
+    "category_gas_transport",
+    "category_grocery_net",
+    "category_grocery_pos",
+    "category_health_fitness",
+    "category_home",
+    "category_kids_pets",
+    "category_misc_net",
+    "category_misc_pos",
+    "category_personal_care",
+    "category_shopping_net",
+    "category_shopping_pos",
+    "category_travel",
+]
+DATE_FORMAT = "%Y-%m-%d"
+# Category dropped by the one-hot encoding, all its dummies are 0
+BASELINE_CATEGORY = "entertainment"
+CATEGORY_POSITIONS = {
+    name[len("category_") :]: position
+    for position, name in enumerate(FEATURE_COLUMNS)
+    if name.startswith("category_")
+}
+
+
+def validate_window(start_date: str, end_date: str):
+    """
+    Raises a ValueError if the dates are not separated by at least one day
+    """
+    start_date_dt = dt.datetime.strptime(str(start_date), DATE_FORMAT)
+    end_date_dt = dt.datetime.strptime(str(end_date), DATE_FORMAT)
+    if (end_date_dt - start_date_dt).days < 1:
+        raise ValueError("The start date must be before the end date")
+
+
+def add_time_columns(df: pd.DataFrame):
+    """
+    Adds the age of the client, and the hour, day and month of the transaction
+    """
+    timestamps = pd.to_datetime(df["trans_date_trans_time"])
+    df["age"] = dt.date.today().year - pd.to_datetime(df["dob"]).dt.year
+    df["hour"] = timestamps.dt.hour
+    df["day"] = timestamps.dt.dayofweek
+    df["month"] = timestamps.dt.month
+
+
+def get_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the features of the model, the categories missing from df are 0
+    so that any subset of the transactions has the same features
+    """
+    features = pd.get_dummies(df[["category"] + FEATURE_COLUMNS[:7]])
+    return features.reindex(columns=FEATURE_COLUMNS, fill_value=False)
+
+
+def transaction_features(transaction: dict) -> np.ndarray:
+    """
+    Returns the features of one raw transaction, in the order of FEATURE_COLUMNS,
+    without building a DataFrame
+
+    Args:
+        - transaction: the raw transaction, with the columns of data/fraud_data.csv
+    """
+    timestamp = dt.datetime.fromisoformat(str(transaction["trans_date_trans_time"]))
+    birth_year = dt.date.fromisoformat(str(transaction["dob"])[:10]).year
+    features = np.zeros(len(FEATURE_COLUMNS), dtype=np.float32)
+    features[:7] = [
+        float(transaction["amt"]),
+        float(transaction["zip"]),
+        float(transaction["city_pop"]),
+        dt.date.today().year - birth_year,
+        timestamp.hour,
+        timestamp.weekday(),
+        timestamp.month,
+    ]
+    category = transaction["category"]
+    if category in CATEGORY_POSITIONS:
+        features[CATEGORY_POSITIONS[category]] = 1
+    elif category != BASELINE_CATEGORY:
+        raise ValueError(f"Unknown category: {category}")
+    return features
+
+
+def confidence_band(fraud_value: float) -> str:
+    """
+    Low if under 0.2, Medium if under 0.5, High if over 0.5
+    """
+    if fraud_value < 0.2:
+        return "Low"
+    return "High" if fraud_value > 0.5 else "Medium"
+
+
+def score_transactions(
+    df: pd.DataFrame,
+    model,
+    threshold: float,
+    start_date: str = "2020-06-21",
+    end_date: str = "2030-01-01",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Predicts the fraud of the transactions of a date window
+
+    Args:
+        - df: the raw transactions, with the columns of data/fraud_data.csv
+        - model: the model used to predict the fraud
+        - threshold: the threshold used to determine if a transaction is fraudulent
+        - start_date: the start date of the transactions
+        - end_date: the end date of the transactions
+
+    Returns:
+        - the transactions of the window with their Fraud, Fraud Confidence
+          and fraud_value columns, and their features
+    """
+    validate_window(start_date, end_date)
+    window = df["trans_date_trans_time"].between(str(start_date), str(end_date))
+    transactions = df[window].copy()
+    add_time_columns(transactions)
+    features = get_features(transactions)
+
+    raw_results = model.predict(features.values)
+    results = [str(min(1, round(result, 2))) for result in raw_results]
+    transactions.insert(0, "fraud_value", results)
+    # Low if under 0.2, Medium if under 0.5, High if over 0.5
+    transactions.insert(
+        0,
+        "Fraud Confidence",
+        np.where(
+            raw_results < 0.2, "Low", np.where(raw_results > 0.5, "High", "Medium")
+        ),
+    )
+    transactions.insert(0, "Fraud", raw_results > threshold)
+
+    # Drop Unnamed: 0 column if it exists
+    if "Unnamed: 0" in transactions.columns:
+        transactions = transactions.drop(columns=["Unnamed: 0"])
+    return transactions, features
+
+
+def explain_transactions(features: pd.DataFrame, model) -> pd.DataFrame:
+    """
+    Returns the SHAP value of every feature of every transaction, computed by
+    xgboost with the same tree algorithm as shap, and the base value
+    """
+    columns = [f"shap_{name}" for name in FEATURE_COLUMNS] + ["shap_base"]
+    if len(features) == 0:
+        # Same columns and types as any other chunk, e.g. for the file header
+        contributions = np.empty((0, len(columns)), dtype=np.float32)
+    else:
+        import xgboost as xgb
+
+        contributions = model.get_booster().predict(
+            xgb.DMatrix(features.values.astype(np.float32)), pred_contribs=True
+        )
+    return pd.DataFrame(contributions, columns=columns, index=features.index)
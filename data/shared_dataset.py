@@ -0,0 +1,110 @@
+""" Scored dataset published once per host and memory-mapped by every GUI worker
+
+Usage: python -m data.shared_dataset [path]
+"""
+
+import json
+import os
+import sys
+from typing import Dict, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+SHARED_DATASET_PATH = "data/shared"
+MANIFEST_FILE = "manifest.json"
+
+
+def publish_dataset(
+    frames: Dict[str, pd.DataFrame], version: str, path: str = SHARED_DATASET_PATH
+):
+    """
+    Writes DataFrames as uncompressed Arrow files that can be memory-mapped
+
+    Args:
+        - frames: the DataFrames by name
+        - version: the version of the dataset
+        - path: the directory of the files and of their manifest
+    """
+    os.makedirs(path, exist_ok=True)
+    files = {}
+    for name, frame in frames.items():
+        table = pa.Table.from_pandas(frame)
+        # Large strings are mapped to pandas strings without a copy
+        schema = pa.schema(
+            [
+                (
+                    field.with_type(pa.large_string())
+                    if pa.types.is_string(field.type)
+                    else field
+                )
+                for field in table.schema
+            ],
+            metadata=table.schema.metadata,
+        )
+        table = table.cast(schema)
+        files[name] = f"{name}.arrow"
+        with pa.OSFile(os.path.join(path, files[name] + ".tmp"), "wb") as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(table)
+        os.replace(
+            os.path.join(path, files[name] + ".tmp"), os.path.join(path, files[name])
+        )
+
+    # Workers attach to the files listed by the manifest, written last
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as manifest_file:
+        json.dump({"version": version, "files": files}, manifest_file)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def _to_pandas_type(arrow_type):
+    if pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+def attach_dataset(
+    path: str = SHARED_DATASET_PATH,
+) -> Tuple[str, Dict[str, pd.DataFrame]]:
+    """
+    Maps the published DataFrames read-only, numeric and string columns are
+    not copied so the pages are shared by every process of the host
+
+    Args:
+        - path: the directory of the published dataset
+
+    Returns:
+        - the version of the dataset and the DataFrames by name
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as manifest_file:
+        manifest = json.load(manifest_file)
+    frames = {}
+    for name, file in manifest["files"].items():
+        source = pa.memory_map(os.path.join(path, file), "r")
+        table = pa.ipc.open_file(source).read_all()
+        frames[name] = table.to_pandas(split_blocks=True, types_mapper=_to_pandas_type)
+    return manifest["version"], frames
+
+
+if __name__ == "__main__":
+    # Loader job: scores the dataset once for the workers started with
+    # FRAUD_SHARED_DATASET=<path>
+    from .data import (
+        data,
+        data_transaction,
+        data_clients,
+        dataset_version,
+    )
+
+    path = sys.argv[1] if len(sys.argv) > 1 else SHARED_DATASET_PATH
+    publish_dataset(
+        {
+            "data": data,
+            "data_transaction": data_transaction,
+            "data_clients": data_clients,
+        },
+        dataset_version,
+        path,
+    )
+    print(f"Dataset {dataset_version} published in {path}")
@@ -0,0 +1,94 @@
+""" Fixed-size, content-addressed thumbnails of the client photos """
+
+import hashlib
+import os
+import sys
+from functools import lru_cache
+
+from flask import Blueprint, send_from_directory
+
+THUMBNAILS_PATH = "data/thumbnails"
+THUMBNAILS_URL = "/thumbnails"
+# Width and height of each variant, twice the displayed size for dense screens
+THUMBNAIL_SIZES = {
+    "icon": (80, 80),
+    "card": (200, 200),
+    "dialog": (400, 400),
+}
+THUMBNAIL_QUALITY = 80
+# Thumbnail names change with their content, so browsers can keep them forever
+CACHE_MAX_AGE = 365 * 24 * 3600
+
+
+def create_thumbnail(path: str, variant: str) -> str:
+    """
+    Creates the thumbnail of an image if it does not exist yet
+
+    Args:
+        - path: the path of the image
+        - variant: the name of the size of the thumbnail
+
+    Returns:
+        - the file name of the thumbnail in THUMBNAILS_PATH
+    """
+    from PIL import Image, ImageOps
+
+    width, height = THUMBNAIL_SIZES[variant]
+    with open(path, "rb") as image_file:
+        digest = hashlib.sha256(image_file.read()).hexdigest()[:16]
+    name = f"{digest}-{width}x{height}.jpg"
+    thumbnail_path = os.path.join(THUMBNAILS_PATH, name)
+    if not os.path.exists(thumbnail_path):
+        os.makedirs(THUMBNAILS_PATH, exist_ok=True)
+        with Image.open(path) as image:
+            thumbnail = ImageOps.fit(image.convert("RGB"), (width, height))
+        thumbnail.save(
+            thumbnail_path + ".tmp",
+            "JPEG",
+            quality=THUMBNAIL_QUALITY,
+            optimize=True,
+        )
+        os.replace(thumbnail_path + ".tmp", thumbnail_path)
+    return name
+
+
+@lru_cache(maxsize=None)
+def _get_thumbnail_url(path: str, modified: int, variant: str) -> str:
+    return f"{THUMBNAILS_URL}/{create_thumbnail(path, variant)}"
+
+
+def thumbnail_url(path: str, variant: str = "card") -> str:
+    """
+    Returns the URL of the thumbnail of an image, the image itself
+    if it cannot be found or Pillow is not installed
+    """
+    if not path:
+        return path
+    try:
+        return _get_thumbnail_url(path, os.stat(path).st_mtime_ns, variant)
+    except (OSError, ImportError):
+        return path
+
+
+thumbnails_blueprint = Blueprint("thumbnails", __name__)
+
+
+@thumbnails_blueprint.route(f"{THUMBNAILS_URL}/<path:name>")
+def serve_thumbnail(name):
+    response = send_from_directory(
+        os.path.abspath(THUMBNAILS_PATH), name, max_age=CACHE_MAX_AGE
+    )
+    response.headers["Cache-Control"] = f"public, max-age={CACHE_MAX_AGE}, immutable"
+    return response
+
+
+if __name__ == "__main__":
+    # Batch job: python -m data.thumbnails [data/clients.csv]
+    import pandas as pd
+
+    path_to_clients = sys.argv[1] if len(sys.argv) > 1 else "data/clients.csv"
+    photos = pd.read_csv(path_to_clients)["Photo"]
+    for photo in photos:
+        for variant in THUMBNAIL_SIZES:
+            create_thumbnail(photo, variant)
+    print(f"Thumbnails of {len(photos)} photos in {THUMBNAILS_PATH}")
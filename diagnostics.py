@@ -0,0 +1,265 @@
+""" Memory used by the state variables of every session, and what they share """
+
+import logging
+import os
+import sys
+import threading
+import time
+import types
+from collections import deque
+from typing import Callable, Dict, Iterable
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, jsonify, request
+from taipy.gui import invoke_callback
+
+from config.user import prune_sessions, user_sessions
+
+# A session holding more bytes of its own than this is reported
+SESSION_MEMORY_BUDGET_MB = float(os.environ.get("SESSION_MEMORY_BUDGET_MB", "200"))
+# Seconds between two snapshots of the history, 0 to only take them on request
+DIAGNOSTICS_INTERVAL = float(os.environ.get("DIAGNOSTICS_INTERVAL", "300"))
+HISTORY_SIZE = 288
+# Not state data: neither measured nor followed
+IGNORED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    threading.Thread,
+)
+# Objects of these libraries are measured without what they reference
+OPAQUE_MODULES = {"taipy", "flask", "werkzeug", "xgboost", "shap"}
+
+diagnostics_logger = logging.getLogger("fraud_detection.memory")
+
+
+def _buffer_key(column: pd.Series) -> int:
+    # The address of the data, the same for every Series viewing the column
+    array = column.array
+    if len(column) == 0:
+        return id(array)
+    if isinstance(column.dtype, np.dtype):
+        return column.to_numpy(copy=False).__array_interface__["data"][0]
+    if hasattr(array, "_pa_array"):
+        chunk = array._pa_array.chunks[0]
+        return chunk.buffers()[-1].address + chunk.offset
+    if isinstance(array, pd.Categorical):
+        return array.codes.__array_interface__["data"][0]
+    if hasattr(array, "_ndarray"):
+        return array._ndarray.__array_interface__["data"][0]
+    return id(array)
+
+
+def value_buffers(value) -> Dict[int, int]:
+    """
+    Returns the size in bytes of each memory buffer of a value, by identity.
+    Shallow copies of a DataFrame have the same buffers for their shared columns.
+    """
+    if isinstance(value, pd.DataFrame):
+        buffers = {id(value.index): int(value.index.memory_usage(deep=True))}
+        for position in range(value.shape[1]):
+            column = value.iloc[:, position]
+            key = _buffer_key(column)
+            buffers[key] = int(column.memory_usage(deep=True, index=False))
+        return buffers
+    if isinstance(value, np.ndarray):
+        base = value if value.base is None else value.base
+        return {id(base): int(value.nbytes)}
+    return {id(value): deep_size(value)}
+
+
+def deep_size(value) -> int:
+    """
+    Returns the size in bytes of an object and of everything it references.
+    Objects of the libraries of the GUI are counted without what they reference.
+    """
+    size = 0
+    seen = set()
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, IGNORED_TYPES):
+            continue
+        seen.add(id(item))
+        if isinstance(item, (pd.DataFrame, np.ndarray)):
+            size += sum(value_buffers(item).values())
+            continue
+        if isinstance(item, (pd.Series, pd.Index)):
+            size += int(item.memory_usage(deep=True))
+            continue
+        size += sys.getsizeof(item, 0)
+        if type(item).__module__.split(".")[0] in OPAQUE_MODULES:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        if hasattr(item, "__dict__"):
+            stack.append(vars(item))
+        for slot in getattr(type(item), "__slots__", ()):
+            if hasattr(item, slot):
+                stack.append(getattr(item, slot))
+    return size
+
+
+def process_memory() -> int:
+    """
+    Returns the resident memory of the process in bytes, 0 if unknown
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _get_variables(state, names: Iterable[str]) -> dict:
+    variables = {}
+    for name in names:
+        try:
+            variables[name] = getattr(state, name)
+        except (AttributeError, KeyError):
+            pass
+    return variables
+
+
+class MemoryDiagnostics:
+    def __init__(self, budget_mb: float = SESSION_MEMORY_BUDGET_MB):
+        """
+        Reports the deep size of the state variables of every session, and the
+        bytes each session holds on its own, not shared with the app or another
+        session.
+
+        Parameters:
+            budget_mb (float): The memory a session may hold on its own.
+        """
+        self.budget = budget_mb * 1024**2
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.gui = None
+        self.app_values: Callable[[], dict] = dict
+        self._lock = threading.Lock()
+
+    def start(self, gui, app_values: Callable[[], dict], interval=DIAGNOSTICS_INTERVAL):
+        """
+        Args:
+            - gui: the Gui of the app
+            - app_values: returns the initial value of every state variable by name,
+              shared by the sessions that have not changed them
+            - interval: the seconds between two snapshots of the history
+        """
+        self.gui = gui
+        self.app_values = app_values
+        if interval > 0:
+
+            def take_snapshots():
+                while True:
+                    time.sleep(interval)
+                    self.report()
+
+            threading.Thread(
+                target=take_snapshots, name="memory-diagnostics", daemon=True
+            ).start()
+
+    def report(self) -> dict:
+        """
+        Measures every session and adds their totals to the history
+        """
+        app_values = {
+            name: value
+            for name, value in self.app_values().items()
+            if not name.startswith("_")
+            and not isinstance(value, IGNORED_TYPES)
+            and type(value).__module__.split(".")[0] not in OPAQUE_MODULES
+        }
+        names = list(app_values)
+        app_buffers = {}
+        for value in app_values.values():
+            app_buffers.update(value_buffers(value))
+
+        session_buffers = {}
+        prune_sessions(self.gui)
+        for username, state_ids in list(user_sessions.items()):
+            for state_id in list(state_ids):
+                try:
+                    variables = invoke_callback(
+                        self.gui, state_id, _get_variables, [names]
+                    )
+                except Exception:
+                    continue
+                if variables:
+                    session_buffers[(username, state_id)] = {
+                        name: value_buffers(value) for name, value in variables.items()
+                    }
+
+        # Buffers of the app, or referenced by several sessions, are shared
+        sessions_by_buffer = {}
+        for session, variables in session_buffers.items():
+            for buffers in variables.values():
+                for key in buffers:
+                    sessions_by_buffer.setdefault(key, set()).add(session)
+
+        sessions = []
+        for (username, state_id), variables in session_buffers.items():
+            session = {
+                "username": username,
+                "state_id": state_id,
+                "variables": {},
+                "size": 0,
+                "own": 0,
+            }
+            for name, buffers in variables.items():
+                own = sum(
+                    size
+                    for key, size in buffers.items()
+                    if key not in app_buffers and len(sessions_by_buffer[key]) == 1
+                )
+                size = sum(buffers.values())
+                session["variables"][name] = {"size": size, "own": own}
+                session["size"] += size
+                session["own"] += own
+            session["over_budget"] = session["own"] > self.budget
+            if session["over_budget"]:
+                diagnostics_logger.warning(
+                    "Session %s of %s holds %.1f MB of its own",
+                    state_id,
+                    username,
+                    session["own"] / 1024**2,
+                )
+            sessions.append(session)
+        sessions.sort(key=lambda session: -session["own"])
+
+        snapshot = {
+            "time": time.time(),
+            "process": process_memory(),
+            "shared": sum(app_buffers.values()),
+            "sessions": len(sessions),
+            "own": sum(session["own"] for session in sessions),
+            "by_session": {session["state_id"]: session["own"] for session in sessions},
+        }
+        with self._lock:
+            self.history.append(snapshot)
+            history = list(self.history)
+        return {
+            "budget": self.budget,
+            "totals": snapshot,
+            "sessions": sessions,
+            "history": history,
+        }
+
+
+memory_diagnostics = MemoryDiagnostics()
+
+diagnostics_blueprint = Blueprint("diagnostics", __name__)
+
+
+@diagnostics_blueprint.route("/diagnostics/memory")
+def serve_memory_report():
+    report = memory_diagnostics.report()
+    if request.args.get("variables") == "0":
+        for session in report["sessions"]:
+            session.pop("variables")
+    return jsonify(report)
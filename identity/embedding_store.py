@@ -0,0 +1,181 @@
+""" Face embeddings of the client reference photos """
+
+import json
+import os
+import sys
+import threading
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from config.event_log import file_signature
+
+EMBEDDINGS_PATH = "data/embeddings"
+MATRIX_FILE = "embeddings.f32"
+MANIFEST_FILE = "manifest.json"
+
+
+def photo_signature(photo: str) -> str:
+    """
+    Identifies a version of a photo without reading it
+    """
+    stat = os.stat(photo)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+class EmbeddingStore:
+    def __init__(self, path: str = EMBEDDINGS_PATH):
+        """
+        Embeddings of the client photos, in a float32 matrix memory-mapped from disk.
+
+        The manifest lists, in row order, the client, the photo and the photo
+        signature each row was computed from. The store is reloaded when the
+        manifest is replaced, e.g. by the batch job of this module.
+
+        Parameters:
+            path (str): The directory of the matrix and of its manifest.
+        """
+        self.path = path
+        self.clients: List[str] = []
+        self.photos: List[str] = []
+        self.signatures: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.version = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._manifest_signature = None
+        self.load()
+
+    def load(self):
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        signature = file_signature(manifest_path)
+        if signature is None:
+            return
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        self._manifest_signature = signature
+        self.clients = manifest["clients"]
+        self.photos = manifest["photos"]
+        self.signatures = manifest["signatures"]
+        self.rows = {client: row for row, client in enumerate(self.clients)}
+        if len(self.clients) > 0:
+            self.matrix = np.memmap(
+                os.path.join(self.path, MATRIX_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self.clients), manifest["dimension"]),
+            )
+        self.version += 1
+
+    def refresh(self):
+        """
+        Reloads the store if its manifest was replaced since it was loaded
+        """
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        if file_signature(manifest_path) == self._manifest_signature:
+            return
+        with self._load_lock:
+            if file_signature(manifest_path) != self._manifest_signature:
+                self.load()
+
+    def __contains__(self, client: str) -> bool:
+        self.refresh()
+        return client in self.rows
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self.clients)
+
+    def vector(self, client: str, photo: str = None) -> np.ndarray:
+        """
+        Returns the embedding of the client, None if it is missing or
+        was computed from another photo than `photo`
+        """
+        self.refresh()
+        row = self.rows.get(client)
+        if row is None or (photo is not None and self.photos[row] != photo):
+            return None
+        return np.array(self.matrix[row])
+
+    def update(
+        self, data_clients: pd.DataFrame, represent: Callable[[List[str]], List]
+    ) -> int:
+        """
+        Embeds the photos that are new or changed since the last update.
+
+        Args:
+            - data_clients: the clients, with their Client and Photo columns
+            - represent: computes the embeddings of a list of photos
+
+        Returns:
+            - the number of photos embedded
+        """
+        with self._lock:
+            clients = list(data_clients["Client"])
+            photos = list(data_clients["Photo"])
+            signatures = [photo_signature(photo) for photo in photos]
+            stale = [
+                i
+                for i, client in enumerate(clients)
+                if client not in self.rows
+                or self.photos[self.rows[client]] != photos[i]
+                or self.signatures[self.rows[client]] != signatures[i]
+            ]
+            if len(clients) == 0 or (
+                len(stale) == 0 and len(clients) == len(self.clients)
+            ):
+                return 0
+            embeddings = dict(zip(stale, represent([photos[i] for i in stale])))
+
+            dimension = (
+                len(next(iter(embeddings.values())))
+                if embeddings
+                else self.matrix.shape[1]
+            )
+            os.makedirs(self.path, exist_ok=True)
+            matrix_path = os.path.join(self.path, MATRIX_FILE)
+            matrix = np.memmap(
+                matrix_path + ".tmp",
+                dtype=np.float32,
+                mode="w+",
+                shape=(len(clients), dimension),
+            )
+            for i, client in enumerate(clients):
+                matrix[i] = (
+                    embeddings[i] if i in embeddings else self.matrix[self.rows[client]]
+                )
+            matrix.flush()
+            del matrix
+            os.replace(matrix_path + ".tmp", matrix_path)
+
+            manifest = {
+                "dimension": dimension,
+                "clients": clients,
+                "photos": photos,
+                "signatures": signatures,
+            }
+            manifest_path = os.path.join(self.path, MANIFEST_FILE)
+            with open(manifest_path + ".tmp", "w") as manifest_file:
+                json.dump(manifest, manifest_file)
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+            self.load()
+            return len(stale)
+
+
+embedding_store = EmbeddingStore()
+
+
+if __name__ == "__main__":
+    # Batch job: python -m identity.embedding_store [data/clients.csv]
+    from .verification_pool import verification_pool, _represent_reference
+
+    path_to_clients = sys.argv[1] if len(sys.argv) > 1 else "data/clients.csv"
+    embedded = embedding_store.update(
+        pd.read_csv(path_to_clients),
+        lambda photos: list(verification_pool.map(_represent_reference, photos)),
+    )
+    print(f"{embedded} photos embedded, {len(embedding_store)} clients in the store")
+    verification_pool.shutdown()
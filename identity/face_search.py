@@ -0,0 +1,78 @@
+""" 1:N face search over the client embeddings """
+
+import numpy as np
+import pandas as pd
+
+from .embedding_store import EmbeddingStore, embedding_store
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# From this number of clients, an approximate index is used when faiss is installed
+APPROXIMATE_SEARCH_MIN_CLIENTS = 100_000
+
+
+class FaceSearch:
+    def __init__(self, store: EmbeddingStore):
+        """
+        Ranks every client of an embedding store by cosine distance to a face.
+
+        The normalized matrix, and the approximate index if any, are rebuilt
+        when the store is updated or reloaded.
+
+        Parameters:
+            store (EmbeddingStore): The client embeddings.
+        """
+        self.store = store
+        self._version = None
+        self._normalized = np.empty((0, 0), dtype=np.float32)
+        self._index = None
+
+    def _refresh(self):
+        self.store.refresh()
+        if self._version == self.store.version:
+            return
+        matrix = np.asarray(self.store.matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self._normalized = np.ascontiguousarray(matrix / norms)
+        self._index = None
+        if faiss is not None and len(matrix) >= APPROXIMATE_SEARCH_MIN_CLIENTS:
+            self._index = faiss.IndexHNSWFlat(
+                matrix.shape[1], 32, faiss.METRIC_INNER_PRODUCT
+            )
+            self._index.add(self._normalized)
+        self._version = self.store.version
+
+    def search(self, embedding, top_k: int = 5) -> pd.DataFrame:
+        """
+        Returns the top_k closest clients with their cosine distance
+        """
+        self._refresh()
+        top_k = min(top_k, len(self._normalized))
+        if top_k == 0:
+            return pd.DataFrame({"Client": [], "Distance": []})
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+        if self._index is not None:
+            similarities, rows = self._index.search(query[np.newaxis], top_k)
+            similarities, rows = similarities[0], rows[0]
+            similarities, rows = similarities[rows >= 0], rows[rows >= 0]
+        else:
+            all_similarities = self._normalized @ query
+            rows = np.argpartition(-all_similarities, top_k - 1)[:top_k]
+            rows = rows[np.argsort(-all_similarities[rows])]
+            similarities = all_similarities[rows]
+
+        return pd.DataFrame(
+            {
+                "Client": [self.store.clients[row] for row in rows],
+                "Distance": np.round(1 - similarities, 4),
+            }
+        )
+
+
+face_search = FaceSearch(embedding_store)
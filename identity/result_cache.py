@@ -0,0 +1,69 @@
+""" Cache of identity verification results """
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from .embedding_store import photo_signature
+
+# Number of results kept
+CACHE_SIZE = int(os.environ.get("FACE_VERIFICATION_CACHE_SIZE", "1024"))
+# Seconds a result stays valid
+CACHE_TTL = float(os.environ.get("FACE_VERIFICATION_CACHE_TTL", "3600"))
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VerificationCache:
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        """
+        Least recently used verification results, by content of the compared images.
+
+        Parameters:
+            max_entries (int): The number of results kept.
+            ttl (float): The seconds a result stays valid.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        # Digests of the reference photos, by path and signature
+        self._reference_digests: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def key(self, path_to_uploaded_image: str, client_photo: str) -> str:
+        reference = (client_photo, photo_signature(client_photo))
+        if reference not in self._reference_digests:
+            self._reference_digests[reference] = file_digest(client_photo)
+        uploaded_digest = file_digest(path_to_uploaded_image)
+        return f"{uploaded_digest}:{self._reference_digests[reference]}"
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expiration, result = entry
+            if expiration < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+verification_cache = VerificationCache()
@@ -0,0 +1,167 @@
+""" Face verification in long-lived worker processes """
+
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+
+# Recognition model kept in memory by every worker
+MODEL_NAME = os.environ.get("FACE_MODEL_NAME", "VGG-Face")
+DISTANCE_METRIC = "cosine"
+# Number of worker processes
+POOL_SIZE = int(os.environ.get("FACE_VERIFICATION_WORKERS", "2"))
+# Number of requests running or waiting before new ones are refused
+QUEUE_SIZE = int(os.environ.get("FACE_VERIFICATION_QUEUE_SIZE", "8"))
+# Seconds a request waits for its result
+TIMEOUT = float(os.environ.get("FACE_VERIFICATION_TIMEOUT", "30"))
+# Load the model when the workers start rather than on the first verification
+LOAD_MODEL_ON_START = os.environ.get("FACE_VERIFICATION_WARM_UP", "0") == "1"
+
+
+class VerificationQueueFull(Exception):
+    pass
+
+
+class NoFaceFound(Exception):
+    pass
+
+
+def _load_model():
+    """
+    DeepFace keeps the built model in a module-level cache of the worker
+    """
+    from deepface import DeepFace
+
+    DeepFace.build_model(MODEL_NAME)
+
+
+def _ready():
+    return True
+
+
+def _verify(path_to_uploaded_image, client_photo):
+    from deepface import DeepFace
+
+    result = DeepFace.verify(
+        path_to_uploaded_image, client_photo, model_name=MODEL_NAME
+    )
+    return {
+        "verified": bool(result["verified"]),
+        "distance": float(result["distance"]),
+    }
+
+
+def _represent(image_path, enforce_detection=True):
+    from deepface import DeepFace
+
+    try:
+        representations = DeepFace.represent(
+            image_path, model_name=MODEL_NAME, enforce_detection=enforce_detection
+        )
+    except ValueError as error:
+        # DeepFace raises a ValueError when no face is detected
+        raise NoFaceFound("No face found in the uploaded image") from error
+    return representations[0]["embedding"]
+
+
+def _represent_reference(image_path):
+    """
+    Reference photos are embedded in batches, a photo without a detected face
+    is embedded whole rather than failing the batch
+    """
+    return _represent(image_path, enforce_detection=False)
+
+
+def _distance_threshold():
+    try:
+        from deepface.modules.verification import find_threshold
+    except ImportError:
+        from deepface.commons.distance import findThreshold as find_threshold
+    return find_threshold(MODEL_NAME, DISTANCE_METRIC)
+
+
+def _verify_embedding(path_to_uploaded_image, reference_embedding):
+    import numpy as np
+
+    embedding = np.asarray(_represent(path_to_uploaded_image), dtype=np.float32)
+    reference_embedding = np.asarray(reference_embedding, dtype=np.float32)
+    distance = 1 - float(
+        embedding @ reference_embedding
+        / (np.linalg.norm(embedding) * np.linalg.norm(reference_embedding))
+    )
+    return {"verified": distance <= _distance_threshold(), "distance": distance}
+
+
+class VerificationPool:
+    def __init__(self, size=POOL_SIZE, queue_size=QUEUE_SIZE, timeout=TIMEOUT):
+        """
+        Pool of worker processes holding the face recognition model in memory.
+
+        Parameters:
+            size (int): The number of worker processes.
+            queue_size (int): The number of requests accepted at the same time.
+            timeout (float): The seconds a request waits for its result.
+        """
+        self.size = size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.size)
+            return self._executor
+
+    def start(self, load_model: bool = LOAD_MODEL_ON_START):
+        """
+        Starts every worker, DeepFace is imported by the first verification
+        of each worker unless load_model is set
+        """
+        task = _load_model if load_model else _ready
+        for future in [self.executor.submit(task) for _ in range(self.size)]:
+            future.result()
+
+    def submit(self, function, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise VerificationQueueFull("Too many identity verifications in progress")
+        try:
+            future = self.executor.submit(function, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, function, *args):
+        future = self.submit(function, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def map(self, function, iterable):
+        """
+        Runs a batch job on the workers, outside of the request queue
+        """
+        return self.executor.map(function, iterable)
+
+    def verify(self, path_to_uploaded_image, client_photo) -> dict:
+        return self.run(_verify, path_to_uploaded_image, client_photo)
+
+    def verify_embedding(self, path_to_uploaded_image, reference_embedding) -> dict:
+        return self.run(_verify_embedding, path_to_uploaded_image, reference_embedding)
+
+    def represent(self, image_path) -> list:
+        return self.run(_represent, image_path)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+verification_pool = VerificationPool()
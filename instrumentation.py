@@ -0,0 +1,204 @@
+""" Latency, CPU time and memory histograms of the callbacks and bound expressions """
+
+import functools
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from typing import Callable, Dict, Tuple
+
+from flask import Blueprint, Response
+
+# Calls slower than this are written to the slow callback log
+SLOW_CALLBACK_SECONDS = float(os.environ.get("SLOW_CALLBACK_SECONDS", "0.5"))
+# Tracing allocations slows every call down, it is opt-in
+TRACE_CALLBACK_MEMORY = os.environ.get("TRACE_CALLBACK_MEMORY", "0") == "1"
+# Metrics are also written to this file every METRICS_FILE_INTERVAL seconds if set
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_FILE_INTERVAL = float(os.environ.get("METRICS_FILE_INTERVAL", "15"))
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = tuple(2**power for power in range(10, 31, 2))
+
+slow_callback_logger = logging.getLogger("fraud_detection.slow_callbacks")
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        """
+        Cumulative histogram in the Prometheus format.
+
+        Parameters:
+            buckets (tuple): The sorted upper bounds of the buckets.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_prometheus(self, metric: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{metric}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class CallbackMetrics:
+    # Metric name, help text and buckets of each measure
+    MEASURES = {
+        "wall": (
+            "callback_wall_seconds",
+            "Wall time of the call",
+            SECONDS_BUCKETS,
+        ),
+        "cpu": (
+            "callback_cpu_seconds",
+            "CPU time of the calling thread",
+            SECONDS_BUCKETS,
+        ),
+        "memory": (
+            "callback_allocated_bytes",
+            "Peak memory allocated during the call",
+            BYTES_BUCKETS,
+        ),
+    }
+
+    def __init__(self):
+        """
+        In-process histograms of every instrumented function, by measure.
+        """
+        self.histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, kind: str, measure: str, value: float):
+        key = (measure, kind, name)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.MEASURES[measure][2])
+            self.histograms[key].observe(value)
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the histograms in the Prometheus text format
+        """
+        lines = []
+        with self._lock:
+            for measure, (metric, help_text, _) in self.MEASURES.items():
+                keys = sorted(key for key in self.histograms if key[0] == measure)
+                if not keys:
+                    continue
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for key in keys:
+                    labels = f'kind="{key[1]}",name="{key[2]}"'
+                    lines.extend(self.histograms[key].to_prometheus(metric, labels))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        with open(path + ".tmp", "w") as metrics_file:
+            metrics_file.write(self.to_prometheus())
+        os.replace(path + ".tmp", path)
+
+
+callback_metrics = CallbackMetrics()
+
+# Memory is only traced by the outermost instrumented call of a thread
+_calls = threading.local()
+
+
+def _with_parameters(function: Callable, call: Callable) -> Callable:
+    """
+    Returns a function passing its arguments to call, with the positional
+    parameters of function: Taipy gives a callback as many arguments as its
+    __code__.co_argcount, which a wrapper taking *args would set to 0
+    """
+    code = function.__code__
+    parameters = ", ".join(code.co_varnames[: code.co_argcount] + ("*args", "**kwargs"))
+    namespace = {"_instrumented_call": call}
+    exec(
+        f"def forward({parameters}):\n    return _instrumented_call({parameters})",
+        namespace,
+    )
+    forward = namespace["forward"]
+    forward.__defaults__ = function.__defaults__
+    return functools.wraps(function)(forward)
+
+
+def instrument(function: Callable = None, *, kind: str = "callback") -> Callable:
+    """
+    Records the wall time, the CPU time and, if TRACE_CALLBACK_MEMORY is set,
+    the memory allocated by each call of a function
+
+    Args:
+        - function: the instrumented function
+        - kind: "callback" or "expression" for functions of bound expressions
+    """
+    if function is None:
+        return functools.partial(instrument, kind=kind)
+    name = function.__qualname__
+
+    def measured(*args, **kwargs):
+        depth = getattr(_calls, "depth", 0)
+        trace_memory = TRACE_CALLBACK_MEMORY and depth == 0
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        _calls.depth = depth + 1
+        start_wall, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.thread_time() - start_cpu
+            _calls.depth = depth
+            callback_metrics.observe(name, kind, "wall", wall)
+            callback_metrics.observe(name, kind, "cpu", cpu)
+            if trace_memory:
+                allocated = tracemalloc.get_traced_memory()[1] - start_memory
+                callback_metrics.observe(name, kind, "memory", allocated)
+            if wall >= SLOW_CALLBACK_SECONDS:
+                slow_callback_logger.warning(
+                    "Slow %s %s: %.3fs wall, %.3fs CPU", kind, name, wall, cpu
+                )
+
+    return _with_parameters(function, measured)
+
+
+def start_metrics_file_writer(
+    path: str = METRICS_FILE, interval: float = METRICS_FILE_INTERVAL
+):
+    """
+    Writes the metrics to a file every `interval` seconds in a daemon thread
+    """
+    if not path:
+        return
+
+    def write_metrics():
+        while True:
+            time.sleep(interval)
+            callback_metrics.write(path)
+
+    threading.Thread(target=write_metrics, name="metrics-writer", daemon=True).start()
+
+
+metrics_blueprint = Blueprint("metrics", __name__)
+
+
+@metrics_blueprint.route("/metrics")
+def serve_metrics():
+    return Response(
+        callback_metrics.to_prometheus(), mimetype="text/plain; version=0.0.4"
+    )
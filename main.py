@@ -2,18 +2,33 @@
 
 from data.data import *
 
+import os
 import pickle
 
 import numpy as np
 import pandas as pd
-from taipy.gui import Gui, State
-from config.user import User
+from flask import Flask
+from taipy.gui import Gui, State, get_state_id
+from config.user import User, NewsfeedConsumer, register_session
+from identity.verification_pool import verification_pool
+from data.thumbnails import thumbnails_blueprint, thumbnail_url
+from instrumentation import (
+    instrument,
+    metrics_blueprint,
+    start_metrics_file_writer,
+)
+from diagnostics import diagnostics_blueprint, memory_diagnostics
 import traceback
 
 from utils import (
     explain_pred,
+    get_feature_importance,
+    get_threshold_results,
+    get_window,
     update_threshold,
     update_table,
+    update_transactions_to_analyze_table,
+    update_historical_transactions_table,
 )
 
 
@@ -25,43 +40,64 @@ from pages.transactions.transactions import *
 from pages.login.login import *
 
 
+# Seconds the state of a disconnected client is kept for it to reconnect
+STATE_RETENTION_PERIOD = int(os.environ.get("STATE_RETENTION_PERIOD", "600"))
+
 fraud_text = "No row selected"
 
 threshold = "0.5"
+# The first and the last day of the date window, all the transactions by default
+dates = [date_index.first_day, date_index.last_day]
+
+# The results of the default threshold and window are computed once per dataset
+# version, every new session is bound to them by reference
+default_results = get_threshold_results(
+    dataset_version, float(threshold), *get_window(dates)
+)
 
 explanation = explanation
-original_transactions = data
+original_transactions = default_results["original_transactions"]
 original_explanation = explanation
 specific_transactions = data_transaction
 
-true_positives = None
-false_positives = None
-true_negatives = None
-false_negatives = None
-displayed_table = None
+true_positives = default_results["true_positives"]
+false_positives = default_results["false_positives"]
+true_negatives = default_results["true_negatives"]
+false_negatives = default_results["false_negatives"]
+displayed_table = true_positives
+confusion_data = default_results["confusion_data"]
+confusion_layout = default_results["confusion_layout"]
 
 
-transactions = data_transaction
+transactions = default_results["transactions"]
+window_transactions = default_results["window_transactions"]
 
+# Computed once per dataset version from the stored explanations
+feature_importance = get_feature_importance(dataset_version)
 
-def on_init(state: State) -> None:
+
+def load_user_data(state: State) -> None:
     """
-    Generate the confusion matrix on start
+    Load the transactions to analyze and the decisions of the user
 
     Args:
         - state: the state of the app
     """
-    state.displayed_table = state.true_positives
-    (
-        state.true_positives,
-        state.true_negatives,
-        state.false_positives,
-        state.false_negatives,
-    ) = update_threshold(state)
-    update_table(state)
+    state.transactions_to_analyze = state.user.get_transactions_to_analyze()
+    state.historical_transactions = state.user.get_historical_transactions()
 
-    state.transactions_to_analyze = state.user.user_info.transactions_to_analyze.read()
-    state.historical_transactions = state.user.user_info.historical_transactions.read()
+
+@instrument
+def on_init(state: State) -> None:
+    """
+    Register the session of the user on start
+    The threshold results are shared, the user data is loaded when first needed
+
+    Args:
+        - state: the state of the app
+    """
+    register_session(state.user.username, get_state_id(state))
+    state.unseen_news = state.user.newsfeed_store.unseen_count()
 
 
 def on_exception(state: State, function_name: str, exception):
@@ -69,46 +105,24 @@ def on_exception(state: State, function_name: str, exception):
     print(traceback.format_exc())
 
 
+@instrument
 def on_change(state, var_name, var_value):
     if var_name == "user":
         on_init(state)
+        load_user_data(state)
     if var_name == "transactions_to_analyze":
-        transactions_to_analyze_table = state.transactions.loc[
-            state.transactions["Transaction Number"].isin(state.transactions_to_analyze)
-        ]
-        state.transactions_to_analyze_table = transactions_to_analyze_table.round(2)
+        update_transactions_to_analyze_table(state)
     elif var_name == "historical_transactions":
-        # Extract transaction IDs and decisions
-        transaction_ids = [
-            item["transaction_id"] for item in state.historical_transactions
-        ]
-        decisions = [item["decision"] for item in state.historical_transactions]
-
-        # Convert decisions to boolean if necessary
-        # Assuming 'decision' is 0 or 1 and 'Fraud' column expects boolean values
-        decisions = [bool(decision) for decision in decisions]
-
-        # Create a mapping dictionary
-        decision_dict = dict(zip(transaction_ids, decisions))
-
-        # Filter historical transactions and make a copy to avoid SettingWithCopyWarning
-        historical_transactions_table = state.transactions[
-            state.transactions["Transaction Number"].isin(transaction_ids)
-        ].copy()
-
-        # Update the 'Fraud' column using map
-        historical_transactions_table["Fraud"] = historical_transactions_table[
-            "Transaction Number"
-        ].map(decision_dict)
-
-        # Round numeric columns and assign to state
-        state.historical_transactions_table = historical_transactions_table.round(2)
+        update_historical_transactions_table(state)
 
 
+@instrument
 def on_navigate(state: State, page):
     if page in ["Transactions", "Analysis", "User", "Threshold-Selection"]:
         state.current_page = page.replace("-", " ")
     if page == "User":
+        if state.transactions_to_analyze is None:
+            load_user_data(state)
         refresh_newsfeed(state)
     return page
 
@@ -126,8 +140,13 @@ pages = {
 if __name__ == "__main__":
     stylekit = {"color-primary": "#231E39", "color-secondary": "#FEBB0B"}
 
-    gui = Gui(pages=pages)
-    newsfeed_partial = gui.add_partial("")
+    # Thumbnails are served by the Flask app of Taipy with long-lived cache headers
+    app = Flask(__name__)
+    app.register_blueprint(thumbnails_blueprint)
+    app.register_blueprint(metrics_blueprint)
+    app.register_blueprint(diagnostics_blueprint)
+    gui = Gui(pages=pages, flask=app)
+    news_actions = [gui.add_partial("") for _ in range(NEWSFEED_PAGE_SIZE)]
 
     # For testing
     User("Vincent")
@@ -136,12 +155,24 @@ if __name__ == "__main__":
     user = User("Florian")
 
     list_of_users = [
-        (s.name, Icon(f"images/{s.name}.png", s.name)) for s in tp.get_scenarios()
+        (s.name, Icon(thumbnail_url(f"images/{s.name}.png", "icon"), s.name))
+        for s in tp.get_scenarios()
     ]
 
+    # Start the verification workers before any other thread
+    verification_pool.start()
+    NewsfeedConsumer(gui, deliver_newsfeed).start()
+    start_metrics_file_writer()
+    # Module variables are the initial values of the state of every session
+    memory_diagnostics.start(gui, lambda: globals())
+
     gui.run(
         title="Fraud Detection Demo",
         dark_mode=False,
         stylekit=stylekit,
         margin="0px",
+        # Set by serve.py for each worker
+        port=int(os.environ.get("GUI_PORT", "5000")),
+        # The state of a disconnected client is removed after this many seconds
+        state_retention_period=STATE_RETENTION_PERIOD,
     )
\ No newline at end of file
@@ -4,12 +4,20 @@ import pandas as pd
 import taipy.gui.builder as tgb
 
 
-from deepface import DeepFace
 import taipy.gui.builder as tgb
 from taipy.gui import invoke_long_callback
 from state_class import State
 from client import Client, Transaction
-from data.data import data
+from data.data import data, client_transaction_index
+from identity.verification_pool import (
+    verification_pool,
+    VerificationQueueFull,
+    NoFaceFound,
+)
+from identity.embedding_store import embedding_store
+from identity.face_search import face_search
+from identity.result_cache import verification_cache
+from data.thumbnails import thumbnail_url
 from components.id_card import (
     verify_identity,
     create_id_card_component,
@@ -27,40 +35,137 @@ default_image = client.photo
 path_to_uploaded_image = None
 is_client_verified = None
 distance = 0
+verification_status = ""
 open_verification_dialog = False
+face_matches = pd.DataFrame({"Client": [], "Distance": [], "Transactions": []})
 
 
 selected_transaction = None
 exp_data = pd.DataFrame({"Feature": [], "Influence": []})
+# Activity of the card before the selected transaction
+velocity_data = pd.DataFrame({"Window": [], "Transactions": [], "Amount": []})
+hours_since_last = 0
+
+# Number of clients listed by the face search
+FACE_SEARCH_TOP_K = 5
 
 waterfall_layout = {
     "margin": {"b": 150},
 }
 
 
-def prcess_image_verification(path_to_uploaded_image, client_photo):
-    return DeepFace.verify(path_to_uploaded_image, client_photo)
+def prcess_image_verification(path_to_uploaded_image, client_name, client_photo):
+    key = verification_cache.key(path_to_uploaded_image, client_photo)
+    result = verification_cache.get(key)
+    if result is not None:
+        return dict(result, cached=True)
+
+    # The precomputed embedding of the reference photo spares embedding it again
+    reference_embedding = embedding_store.vector(client_name, client_photo)
+    try:
+        if reference_embedding is not None:
+            result = verification_pool.verify_embedding(
+                path_to_uploaded_image, reference_embedding
+            )
+        else:
+            result = verification_pool.verify(path_to_uploaded_image, client_photo)
+    except VerificationQueueFull:
+        return None
+    except NoFaceFound as error:
+        return error
+    verification_cache.put(key, result)
+    return result
 
 
-def finish_identity(state: State, status, result):
+def finish_identity(state: State, status, result=None):
+    if isinstance(status, int) and not isinstance(status, bool):
+        state.verification_status = f"Verification in progress... ({status}s)"
+        return
+    state.verification_status = ""
+    if not status:
+        notify(state, "error", "The identity verification failed, please try again")
+        return
+    if result is None:
+        notify(state, "warning", "Too many verifications in progress, please retry")
+        return
+    if isinstance(result, NoFaceFound):
+        notify(state, "error", str(result))
+        return
     state.is_client_verified = result["verified"]
     state.distance = result["distance"]
+    cached = " (cached result)" if result.get("cached") else ""
     if state.is_client_verified:
-        notify(state, "success", "The user has been verified!")
+        notify(state, "success", f"The user has been verified!{cached}")
     else:
-        notify(state, "error", "The user has not been verified!")
+        notify(state, "error", f"The user has not been verified!{cached}")
 
 
 def upload_image(state: State):
     state.is_client_verified = None
+    state.verification_status = "Verification in progress..."
     invoke_long_callback(
         state,
         user_function=prcess_image_verification,
-        user_function_args=[state.path_to_uploaded_image, state.client.photo],
+        user_function_args=[
+            state.path_to_uploaded_image,
+            state.client.name,
+            state.client.photo,
+        ],
         user_status_function=finish_identity,
+        period=1000,
+    )
+
+
+def process_face_search(path_to_uploaded_image):
+    try:
+        embedding = verification_pool.represent(path_to_uploaded_image)
+    except VerificationQueueFull:
+        return None
+    except NoFaceFound as error:
+        return error
+    return face_search.search(embedding, top_k=FACE_SEARCH_TOP_K)
+
+
+def finish_face_search(state: State, status, result=None):
+    if isinstance(status, int) and not isinstance(status, bool):
+        state.verification_status = f"Search in progress... ({status}s)"
+        return
+    state.verification_status = ""
+    if not status or result is None:
+        notify(state, "error", "The search failed, please try again")
+        return
+    if isinstance(result, NoFaceFound):
+        notify(state, "error", str(result))
+        return
+    result["Transactions"] = [
+        len(client_transaction_index.get(client)) for client in result["Client"]
+    ]
+    state.face_matches = result
+
+
+def search_face(state: State):
+    if not state.path_to_uploaded_image:
+        notify(state, "warning", "Upload an image first")
+        return
+    state.verification_status = "Search in progress..."
+    invoke_long_callback(
+        state,
+        user_function=process_face_search,
+        user_function_args=[state.path_to_uploaded_image],
+        user_status_function=finish_face_search,
+        period=1000,
     )
 
 
+def select_face_match(state: State, var_name: str, payload: dict):
+    client = state.face_matches.loc[payload["index"], "Client"]
+    state.client = Client(client)
+    state.specific_transactions = client_transaction_index.take(
+        state.transactions, client
+    )
+    state.open_verification_dialog = False
+
+
 def sum_fraud(specific_transactions):
     return (
         specific_transactions["Fraud"].sum()
@@ -121,6 +226,23 @@ with tgb.Page() as analysis_page:
             type="none",
             height=200,
         )
+        with tgb.part():
+            with tgb.part(render="{hours_since_last is not None}"):
+                tgb.metric(
+                    title="Hours since the previous transaction",
+                    value="{hours_since_last or 0}",
+                    type="none",
+                    height=200,
+                )
+            with tgb.part(render="{hours_since_last is None}"):
+                tgb.text("#### First transaction of the card", mode="md")
+
+    tgb.text("### Recent activity", mode="md")
+    tgb.text(
+        "Transactions of the card in the hour, the day and the week up to the selected transaction.",
+        mode="md",
+    )
+    tgb.table("{velocity_data}", show_all=True)
 
     tgb.text("### Transaction History", mode="md")
     tgb.text(
@@ -156,17 +278,18 @@ with tgb.Page() as analysis_page:
             ):
                 tgb.text("## Default image", mode="md")
                 tgb.image(
-                    "{client.photo}",
+                    "{thumbnail_url(client.photo, 'dialog')}",
                     width="200px",
                 )
             with tgb.part(render="{path_to_uploaded_image}"):
                 tgb.text("## Chosen image", mode="md")
                 tgb.image(
-                    "{path_to_uploaded_image}",
+                    "{thumbnail_url(path_to_uploaded_image, 'dialog')}",
                     width="200px",
                 )
 
         tgb.text("## Result", mode="md")
+        tgb.text("{verification_status}", render="{verification_status != ''}")
         tgb.text(
             "Are the two pictures from the same person? ({client.first_name} {client.last_name})",
             mode="md",
@@ -186,4 +309,17 @@ with tgb.Page() as analysis_page:
                 mode="md",
             )
 
+        tgb.text("## Who is this?", mode="md")
+        tgb.text(
+            "Compare the uploaded image with every client. Select a client to see their transactions.",
+            mode="md",
+        )
+        tgb.button("Search all clients", on_action=search_face)
+        tgb.table(
+            "{face_matches}",
+            on_action=select_face_match,
+            render="{len(face_matches) > 0}",
+            show_all=True,
+        )
+
     build_dialog()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import taipy.gui.builder as tgb
+from taipy.gui import notify
+from state_class import State
+from config.user import teams
+
+
+show_share_dialog = False
+share_transaction_numbers = []
+share_receivers = []
+share_comment = ""
+
+
+def receivers_lov(list_of_users):
+    return [user[0] for user in list_of_users or []] + list(teams)
+
+
+def transactions_lov(transaction, transactions_to_analyze):
+    transaction_numbers = [transaction.transaction_number] if transaction else []
+    return list(dict.fromkeys(transaction_numbers + list(transactions_to_analyze or [])))
+
+
+def open_dialog(state: State):
+    state.share_transaction_numbers = [state.transaction.transaction_number]
+    state.share_receivers = []
+    state.share_comment = ""
+    state.show_share_dialog = True
+
+
+def share(state: State, id, payload):
+    state.show_share_dialog = False
+    # Buttons are "Share;Cancel", closing the dialog sends -1
+    if payload["args"][0] != 0:
+        return
+    if not state.share_transaction_numbers or not state.share_receivers:
+        notify(state, "warning", "Select at least one transaction and one receiver")
+        return
+    receivers = state.user.share_transactions(
+        list(state.share_transaction_numbers),
+        list(state.share_receivers),
+        state.share_comment,
+    )
+    notify(
+        state,
+        "success",
+        f"{len(state.share_transaction_numbers)} transaction(s) shared with {len(receivers)} user(s)",
+    )
+
+
+def build_dialog():
+    with tgb.dialog(
+        title="Share transactions",
+        open="{show_share_dialog}",
+        on_action=share,
+        labels="Share;Cancel",
+        width="500px",
+    ):
+        tgb.selector(
+            "{share_transaction_numbers}",
+            lov="{transactions_lov(transaction, transactions_to_analyze)}",
+            multiple=True,
+            dropdown=True,
+            label="Transactions",
+            class_name="fullwidth",
+        )
+        tgb.selector(
+            "{share_receivers}",
+            lov="{receivers_lov(list_of_users)}",
+            multiple=True,
+            dropdown=True,
+            label="Users or teams",
+            class_name="fullwidth",
+        )
+        tgb.input(
+            "{share_comment}",
+            label="Comment",
+            multiline=True,
+            class_name="fullwidth",
+        )
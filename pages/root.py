@@ -43,6 +43,13 @@ with tgb.Page() as root:
                     on_action="{open_dialog_user}",
                 )
                 tgb.text("!", mode="md", inline=True)
+                tgb.text(
+                    "**{unseen_news}** new",
+                    mode="md",
+                    inline=True,
+                    class_name="badge",
+                    render="{unseen_news > 0}",
+                )
             tgb.image(
                 "images/{user.username if user is not None else 'Login'}.png",
                 width="40px",
@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 import taipy.gui.builder as tgb
 
-from utils import update_threshold, update_table, fraud_style
+from utils import update_threshold, update_table, update_window, fraud_style
 
 confusion_data = pd.DataFrame({"Predicted": [], "Actual": [], "Values": []})
 confusion_layout = None
@@ -23,6 +23,12 @@ with tgb.Page() as threshold_page:
         lov="0.05;0.1;0.15;0.2;0.25;0.3;0.35;0.4;0.45;0.5;0.55;0.6;0.65;0.7;0.75;0.8;0.85;0.9;0.95",
         continuous=False,
     )
+    tgb.date_range(
+        "{dates}",
+        label_start="From",
+        label_end="To",
+        on_change=update_window,
+    )
 
     with tgb.layout(columns="2 3"):
         with tgb.part():
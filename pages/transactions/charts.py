@@ -3,7 +3,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 
+from instrumentation import instrument
 
+
+@instrument(kind="expression")
 def gen_amt_figure(transactions: pd.DataFrame) -> px.histogram:
     """
     Generates a histogram of transaction amounts for fraudulent and non-fraudulent transactions.
@@ -35,6 +38,7 @@ def gen_amt_figure(transactions: pd.DataFrame) -> px.histogram:
     return fig
 
 
+@instrument(kind="expression")
 def gen_gender_figure(transactions: pd.DataFrame) -> px.bar:
     """
     Generates a bar chart showing the distribution of fraud by gender.
@@ -78,6 +82,7 @@ def gen_gender_figure(transactions: pd.DataFrame) -> px.bar:
     return fig
 
 
+@instrument(kind="expression")
 def gen_cat_figure(transactions: pd.DataFrame) -> px.bar:
     """
     Generates a bar chart showing the difference in fraudulence by category.
@@ -119,6 +124,7 @@ def gen_cat_figure(transactions: pd.DataFrame) -> px.bar:
     return fig
 
 
+@instrument(kind="expression")
 def gen_hour_figure(transactions: pd.DataFrame) -> go.Figure:
     """
     Generates a polar bar chart showing the distribution of fraudulent and non-fraudulent transactions by hour.
@@ -235,6 +241,7 @@ def gen_hour_figure(transactions: pd.DataFrame) -> go.Figure:
     return fig
 
 
+@instrument(kind="expression")
 def gen_day_figure(transactions: pd.DataFrame) -> px.bar_polar:
     """
     Generates a polar bar chart showing the distribution of fraud by day of the week.
@@ -304,6 +311,7 @@ def gen_day_figure(transactions: pd.DataFrame) -> px.bar_polar:
     return fig
 
 
+@instrument(kind="expression")
 def plot_gender_distribution(data_clients: pd.DataFrame):
     """
     Creates a bar chart showing the distribution of clients by gender.
@@ -329,6 +337,7 @@ def plot_gender_distribution(data_clients: pd.DataFrame):
     return fig
 
 
+@instrument(kind="expression")
 def plot_age_distribution(data_clients: pd.DataFrame):
     """
     Creates a histogram showing the distribution of clients by age.
@@ -351,6 +360,7 @@ def plot_age_distribution(data_clients: pd.DataFrame):
     return fig
 
 
+@instrument(kind="expression")
 def plot_client_density_by_state(data_clients: pd.DataFrame):
     """
     Creates a choropleth map showing the number of clients in each state.
@@ -390,6 +400,7 @@ def plot_client_density_by_state(data_clients: pd.DataFrame):
     return fig
 
 
+@instrument(kind="expression")
 def plot_client_density_heatmap(data_clients: pd.DataFrame):
     """
     Creates a heatmap showing the density of client locations.
@@ -426,6 +437,7 @@ def plot_client_density_heatmap(data_clients: pd.DataFrame):
     return fig
 
 
+@instrument(kind="expression")
 def plot_fraud_rate_by_state(data: pd.DataFrame):
     """
     Creates a choropleth map showing the fraud rate by state.
@@ -465,6 +477,7 @@ def plot_fraud_rate_by_state(data: pd.DataFrame):
     return fig
 
 
+@instrument(kind="expression")
 def plot_transactions_by_category_state(data: pd.DataFrame):
     """
     Creates a treemap showing transaction amounts by category and state.
@@ -488,6 +501,7 @@ def plot_transactions_by_category_state(data: pd.DataFrame):
     return fig
 
 
+@instrument(kind="expression")
 def plot_transactions_sunburst(data: pd.DataFrame):
     """
     Creates a sunburst chart showing transactions by category and merchant.
@@ -511,6 +525,7 @@ def plot_transactions_sunburst(data: pd.DataFrame):
     return fig
 
 
+@instrument(kind="expression")
 def plot_top_categories_back_to_back(data: pd.DataFrame):
     """
     Creates a horizontal back-to-back bar chart showing the top 10 categories consumed by male and female clients.
@@ -630,6 +645,7 @@ def plot_top_categories_back_to_back(data: pd.DataFrame):
     return fig
 
 
+@instrument(kind="expression")
 def plot_transactions_sunburst_state_category(data: pd.DataFrame):
     """
     Creates a sunburst chart showing transaction amounts by state and category.
@@ -662,4 +678,51 @@ def plot_transactions_sunburst_state_category(data: pd.DataFrame):
 
     fig.update_layout(margin=dict(t=50, l=0, r=0, b=0))
 
-    return fig
\ No newline at end of file
+    return fig
+
+
+@instrument(kind="expression")
+def plot_feature_importance(importance: pd.DataFrame):
+    """
+    Creates a bar chart of the mean absolute SHAP value of every feature.
+
+    Args:
+        importance: DataFrame with the Feature and its Importance, the most important first.
+
+    Returns:
+        A Plotly Figure object representing the bar chart.
+    """
+    fig = px.bar(
+        importance.iloc[::-1],
+        x="Importance",
+        y="Feature",
+        orientation="h",
+        title="Feature Importance (mean |SHAP value|)",
+        labels={"Importance": "Mean |SHAP value|"},
+    )
+    fig.update_layout(margin={"r": 0, "t": 50, "l": 0, "b": 0})
+
+    return fig
+
+
+@instrument(kind="expression")
+def plot_segment_importance(segment_importance: pd.DataFrame):
+    """
+    Creates a heatmap of the mean absolute SHAP value of every feature by segment.
+
+    Args:
+        segment_importance: DataFrame with one row per segment and one column per feature.
+
+    Returns:
+        A Plotly Figure object representing the heatmap.
+    """
+    fig = px.imshow(
+        segment_importance,
+        aspect="auto",
+        color_continuous_scale="Blues",
+        title=f"Feature Importance by {segment_importance.index.name or 'Segment'}",
+        labels={"x": "Feature", "y": "", "color": "Mean |SHAP value|"},
+    )
+    fig.update_layout(margin={"r": 0, "t": 50, "l": 0, "b": 0})
+
+    return fig
@@ -7,10 +7,12 @@ from .charts import (
     gen_day_figure,
     gen_gender_figure,
     gen_hour_figure,
+    plot_feature_importance,
     plot_age_distribution,
     plot_client_density_by_state,
     plot_client_density_heatmap,
     plot_gender_distribution,
+    plot_segment_importance,
     plot_fraud_rate_by_state,
     plot_transactions_by_category_state,
     plot_transactions_sunburst,
@@ -19,10 +21,13 @@ from .charts import (
 )
 from state_class import State
 import pandas as pd
-from utils import explain_pred, fraud_style
+from utils import explain_pred, fraud_style, update_window
+from data.feature_importance import SEGMENTATIONS
 
 
 selected_representation = "Fraud"
+# Segment column of the feature importance heatmap
+importance_segmentation = "Category"
 
 
 with tgb.Page() as transactions_page:
@@ -34,11 +39,19 @@ with tgb.Page() as transactions_page:
         mode="md",
     )
 
+    # Every table and chart of the page shows the transactions of this window
+    tgb.date_range(
+        "{dates}",
+        label_start="From",
+        label_end="To",
+        on_change=update_window,
+    )
+
     with tgb.expandable(title="All transactions", expanded=False):
         tgb.text("Select a transaction to explain the prediction", mode="md")
 
         tgb.table(
-            "{transactions}",
+            "{window_transactions}",
             on_action=explain_pred,
             row_class_name=fraud_style,
             filter=True,
@@ -51,6 +64,7 @@ with tgb.Page() as transactions_page:
             "Fraud",
             "Clients",
             "Transactions",
+            "Explainability",
         ],
     )
 
@@ -96,4 +110,26 @@ with tgb.Page() as transactions_page:
             )
             tgb.chart(
                 figure="{plot_top_categories_back_to_back(original_transactions)}"
-            )
\ No newline at end of file
+            )
+
+    with tgb.part(render="{selected_representation=='Explainability'}"):
+        tgb.text("### Explainability **Analysis**", mode="md")
+        tgb.text(
+            "Here is the mean absolute SHAP value of each feature over all the transactions, and by category, state or confidence band.",
+            mode="md",
+        )
+
+        with tgb.layout("1 1"):
+            tgb.chart(
+                figure="{plot_feature_importance(feature_importance.importance())}"
+            )
+            with tgb.part():
+                tgb.selector(
+                    "{importance_segmentation}",
+                    lov=SEGMENTATIONS,
+                    label="Segment by",
+                    dropdown=True,
+                )
+                tgb.chart(
+                    figure="{plot_segment_importance(feature_importance.segment_importance(importance_segmentation))}"
+                )
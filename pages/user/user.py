@@ -5,6 +5,7 @@ from components.newsfeed import *
 
 
 newsfeed = None
+unseen_news = 0
 transactions_to_analyze = None
 historical_transactions = None
 transactions_to_analyze_table = None
@@ -12,9 +13,31 @@ historical_transactions_table = None
 
 
 def refresh_newsfeed(state: State):
-    state.newsfeed = NewsFeed(state.user)
+    if state.newsfeed is None or state.newsfeed.user.username != state.user.username:
+        state.newsfeed = NewsFeed(state.user)
+    else:
+        state.newsfeed.sync()
     state.newsfeed.set_newsfeed_df_to_seen()
-    state.newsfeed_partial.update_content(state, state.newsfeed.create_newsfeed())
+    state.unseen_news = 0
+    show_news_page(state, 0)
+
+
+def deliver_newsfeed(state: State, username: str):
+    """
+    Called by the NewsfeedConsumer in the sessions of a user whose newsfeed changed.
+    """
+    if state.user is None or state.user.username != username:
+        return
+    if state.newsfeed is None:
+        state.unseen_news = state.user.newsfeed_store.unseen_count()
+        return
+    added_news = state.newsfeed.sync()
+    if state.current_page == "User":
+        state.newsfeed.set_newsfeed_df_to_seen()
+        show_news_page(state)
+    state.unseen_news = state.user.newsfeed_store.unseen_count()
+    for news in added_news:
+        notify(state, "info", f"{news.sender_username} sent you a transaction")
 
 
 with tgb.Page() as user_page:
@@ -43,5 +66,4 @@ with tgb.Page() as user_page:
         )
 
     tgb.text("## Notifications", mode="md")
-    tgb.button("Refresh news feed", on_action=refresh_newsfeed)
-    tgb.part(partial="{newsfeed_partial}")
\ No newline at end of file
+    create_newsfeed_component()
\ No newline at end of file
@@ -0,0 +1,262 @@
+""" Batch fraud scoring of a transactions file, without the GUI
+
+Usage: python score.py input.csv output.parquet [--start-date 2020-06-21]
+       [--end-date 2030-01-01] [--threshold 0.5] [--explain]
+       [--chunk-rows 200000] [--workers 4] [--model model.pkl] [--velocity]
+
+Input and output files are CSV, Parquet or Arrow/Feather, by extension.
+With --velocity, the input must be sorted by date: the rolling activity of each
+card is carried from one chunk to the next.
+"""
+
+import argparse
+import os
+import pickle
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from data.feature_importance import FeatureImportance
+from data.scoring import (
+    FEATURE_COLUMNS,
+    explain_transactions,
+    score_transactions,
+    validate_window,
+)
+from data.velocity import VelocityEngine
+
+CHUNK_ROWS = 200_000
+COLUMNAR_EXTENSIONS = (".parquet", ".arrow", ".feather")
+
+# Segment columns of the feature importance, in the raw transactions
+IMPORTANCE_SEGMENTS = {
+    "Category": "category",
+    "State": "state",
+    "Fraud Confidence": "Fraud Confidence",
+}
+
+# Model of the scoring process, loaded once per worker
+_model = None
+
+
+def _load_model(path: str):
+    global _model
+    with open(path, "rb") as model_file:
+        _model = pickle.load(model_file)
+
+
+def _score_chunk(
+    chunk: pd.DataFrame, threshold: float, start_date: str, end_date: str, explain
+) -> pd.DataFrame:
+    transactions, features = score_transactions(
+        chunk, _model, threshold, start_date, end_date
+    )
+    if explain:
+        transactions = transactions.join(explain_transactions(features, _model))
+    return transactions
+
+
+def read_chunks(path: str, chunk_rows: int):
+    """
+    Yields the transactions of a file by chunks of chunk_rows rows
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif extension in (".arrow", ".feather"):
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+class ChunkWriter:
+    def __init__(self, path: str):
+        """
+        Writes the scored chunks to a CSV, Parquet or Arrow file, in order.
+
+        Parameters:
+            path (str): The path of the output file.
+        """
+        self.path = path
+        self.extension = os.path.splitext(path)[1].lower()
+        self.schema = None
+        self._writer = None
+        self._empty_chunk = None
+
+    def write(self, chunk: pd.DataFrame):
+        # Columns take the types of the first rows, an empty chunk has none
+        if len(chunk) == 0 and self._writer is None:
+            self._empty_chunk = chunk
+            return
+        self._write(chunk)
+
+    def _write(self, chunk: pd.DataFrame):
+        if self.extension not in COLUMNAR_EXTENSIONS:
+            chunk.to_csv(
+                self.path,
+                mode="a" if self._writer else "w",
+                header=not self._writer,
+                index=False,
+            )
+            self._writer = True
+            return
+
+        import pyarrow as pa
+
+        if self._writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            self.schema = table.schema
+            if self.extension == ".parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, table.schema)
+        else:
+            # Columns keep the types of the first chunk
+            table = pa.Table.from_pandas(
+                chunk, schema=self.schema, preserve_index=False
+            )
+        self._writer.write_table(table)
+
+    def close(self):
+        # Every chunk was empty, the file still has the columns
+        if self._writer is None and self._empty_chunk is not None:
+            self._write(self._empty_chunk)
+        if self._writer not in (None, True):
+            self._writer.close()
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    threshold: float = 0.5,
+    start_date: str = "2020-06-21",
+    end_date: str = "2030-01-01",
+    explain: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+    workers: int = 1,
+    model_path: str = "model.pkl",
+    velocity: bool = False,
+) -> dict:
+    """
+    Scores a file of transactions chunk by chunk, on `workers` processes
+    The velocity features are computed in order in this process, and the
+    feature importance is updated with every explained chunk
+
+    Returns:
+        - the throughput summary of the run, and the feature importance if explained
+    """
+    validate_window(start_date, end_date)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    writer = ChunkWriter(output_path)
+    summary = {"chunks": 0, "rows": 0, "scored": 0, "flagged": 0}
+    start = time.perf_counter()
+    engine = VelocityEngine() if velocity else None
+    importance = FeatureImportance(FEATURE_COLUMNS, IMPORTANCE_SEGMENTS)
+
+    def read():
+        for chunk in read_chunks(input_path, chunk_rows):
+            summary["chunks"] += 1
+            summary["rows"] += len(chunk)
+            if engine is not None:
+                features = engine.transform_frame(
+                    chunk, "cc_num", "trans_date_trans_time", "amt"
+                )
+                chunk = chunk.join(features.add_prefix("velocity_"))
+            yield chunk
+
+    def write(scored: pd.DataFrame):
+        writer.write(scored)
+        summary["scored"] += len(scored)
+        summary["flagged"] += int(scored["Fraud"].sum())
+        if explain and len(scored) > 0:
+            importance.add(
+                scored[[f"shap_{name}" for name in FEATURE_COLUMNS]].to_numpy(),
+                {name: scored[column] for name, column in IMPORTANCE_SEGMENTS.items()},
+            )
+
+    try:
+        if workers <= 1:
+            _load_model(model_path)
+            for chunk in read():
+                write(_score_chunk(chunk, threshold, start_date, end_date, explain))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_load_model, initargs=(model_path,)
+            ) as executor:
+                # A few chunks per worker are in flight, results are written in order
+                pending = deque()
+                for chunk in read():
+                    pending.append(
+                        executor.submit(
+                            _score_chunk,
+                            chunk,
+                            threshold,
+                            start_date,
+                            end_date,
+                            explain,
+                        )
+                    )
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        writer.close()
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["rows_per_second"] = summary["rows"] / max(summary["seconds"], 1e-9)
+    if explain:
+        summary["importance"] = importance
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--start-date", default="2020-06-21")
+    parser.add_argument("--end-date", default="2030-01-01")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--explain", action="store_true", help="adds SHAP values")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--model", default="model.pkl")
+    parser.add_argument(
+        "--velocity", action="store_true", help="adds the rolling activity of the card"
+    )
+    args = parser.parse_args()
+
+    summary = score_file(
+        args.input,
+        args.output,
+        args.threshold,
+        args.start_date,
+        args.end_date,
+        args.explain,
+        args.chunk_rows,
+        args.workers,
+        args.model,
+        args.velocity,
+    )
+    print(
+        f"{summary['rows']} rows read in {summary['chunks']} chunks, "
+        f"{summary['scored']} scored in the window, {summary['flagged']} flagged"
+    )
+    print(
+        f"{summary['seconds']:.1f}s, {summary['rows_per_second']:.0f} rows/s "
+        f"with {args.workers} worker(s)"
+    )
+    if args.explain:
+        print("Most important features (mean |SHAP value|):")
+        print(summary["importance"].importance().head(5).to_string(index=False))
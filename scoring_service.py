@@ -0,0 +1,226 @@
+""" Real-time scoring of single transactions, grouped in micro-batches
+
+Usage: python scoring_service.py [--port 8100] [--max-batch 64]
+       [--max-wait-ms 1] [--threshold 0.5] [--model model.pkl]
+
+POST /score?explain=3 with a raw transaction as JSON, with the columns of
+data/fraud_data.csv, returns its fraud value, whether it is fraudulent, its
+confidence band and, if explain is set, its most contributing features.
+GET /stats returns the latency percentiles and the mean batch size.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from data.scoring import FEATURE_COLUMNS, confidence_band, transaction_features
+
+PORT = int(os.environ.get("SCORING_PORT", "8100"))
+# Requests arriving within MAX_WAIT_MS of the first one of a batch are scored with it
+MAX_BATCH = int(os.environ.get("SCORING_MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.environ.get("SCORING_MAX_WAIT_MS", "1"))
+# Seconds a request waits for its score
+TIMEOUT = 1.0
+# Number of latencies kept for the statistics
+STATS_SIZE = 10_000
+
+
+class _ScoringRequest:
+    __slots__ = ("features", "explain", "received", "done", "result", "error")
+
+    def __init__(self, features: np.ndarray, explain: int):
+        self.features = features
+        self.explain = explain
+        self.received = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        model,
+        threshold: float = 0.5,
+        max_batch: int = MAX_BATCH,
+        max_wait_ms: float = MAX_WAIT_MS,
+    ):
+        """
+        Scores the transactions of concurrent requests together on one thread.
+
+        Parameters:
+            model (xgb.XGBRegressor): The model used to predict the fraud.
+            threshold (float): The threshold used to determine if a transaction
+                is fraudulent.
+            max_batch (int): The maximum number of transactions per batch.
+            max_wait_ms (float): The latency budget of a batch, in milliseconds.
+        """
+        self.model = model
+        self.threshold = threshold
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.latencies = deque(maxlen=STATS_SIZE)
+        self.batch_sizes = deque(maxlen=STATS_SIZE)
+        # Held while the statistics are updated or copied
+        self._stats_lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name="micro-batcher", daemon=True).start()
+
+    def score(self, transaction: dict, explain: int = 0) -> dict:
+        """
+        Returns the score of one transaction, raises a ValueError or a KeyError
+        if the transaction is invalid and a TimeoutError if it is not scored in time
+        """
+        request = _ScoringRequest(transaction_features(transaction), explain)
+        self._queue.put(request)
+        if not request.done.wait(TIMEOUT):
+            raise TimeoutError("The transaction was not scored in time")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._score_batch(batch)
+            except Exception as error:
+                for request in batch:
+                    request.error = error
+            for request in batch:
+                request.done.set()
+            done = time.perf_counter()
+            with self._stats_lock:
+                self.latencies.extend(done - request.received for request in batch)
+                self.batch_sizes.append(len(batch))
+
+    def _score_batch(self, batch: list):
+        features = np.stack([request.features for request in batch])
+        raw_results = self.model.predict(features)
+
+        explained = [i for i, request in enumerate(batch) if request.explain > 0]
+        contributions = {}
+        if explained:
+            import xgboost as xgb
+
+            matrix = self.model.get_booster().predict(
+                xgb.DMatrix(features[explained]), pred_contribs=True
+            )
+            contributions = dict(zip(explained, matrix[:, :-1]))
+
+        for i, request in enumerate(batch):
+            result = float(raw_results[i])
+            request.result = {
+                "fraud_value": min(1, round(result, 2)),
+                "fraud": result > self.threshold,
+                "confidence": confidence_band(result),
+            }
+            if i in contributions:
+                top = np.argsort(-np.abs(contributions[i]))[: request.explain]
+                request.result["top_features"] = [
+                    {
+                        "feature": FEATURE_COLUMNS[feature],
+                        "contribution": float(contributions[i][feature]),
+                    }
+                    for feature in top
+                ]
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            latencies = list(self.latencies)
+            batch_sizes = list(self.batch_sizes)
+        if len(latencies) == 0:
+            return {"requests": 0}
+        latencies = np.array(latencies) * 1000
+        return {
+            "requests": len(latencies),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "max_ms": float(latencies.max()),
+            "mean_batch_size": float(np.mean(batch_sizes)),
+        }
+
+
+def create_server(batcher: MicroBatcher, port: int = PORT) -> ThreadingHTTPServer:
+    """
+    Creates the HTTP server of the scoring service, connections are kept alive
+    """
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes, Nagle would delay the body
+        disable_nagle_algorithm = True
+
+        def send_json(self, status: int, body: dict):
+            content = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            content = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if url.path != "/score":
+                self.send_json(404, {"error": "Not found"})
+                return
+            try:
+                explain = int(parse_qs(url.query).get("explain", ["0"])[0])
+                self.send_json(200, batcher.score(json.loads(content), explain))
+            except KeyError as error:
+                self.send_json(400, {"error": f"Missing field: {error}"})
+            except (TypeError, ValueError) as error:
+                self.send_json(400, {"error": str(error)})
+            except TimeoutError as error:
+                self.send_json(503, {"error": str(error)})
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/stats":
+                self.send_json(200, batcher.stats())
+            else:
+                self.send_json(404, {"error": "Not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer(("", port), ScoringHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--model", default="model.pkl")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as model_file:
+        model = pickle.load(model_file)
+    batcher = MicroBatcher(model, args.threshold, args.max_batch, args.max_wait_ms)
+    server = create_server(batcher, args.port)
+    print(f"Scoring transactions on port {args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
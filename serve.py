@@ -0,0 +1,90 @@
+""" Runs several GUI workers on one host, sharing one copy of the scored dataset
+
+Usage: python serve.py [--workers 4] [--port 5000] [--shared-dataset data/shared]
+
+The dataset is scored and published once, then every worker started on
+port + 1, port + 2... memory-maps it. New visitors of port are redirected to
+the workers in turn, and stay on their worker for the rest of their session.
+"""
+
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data.shared_dataset import SHARED_DATASET_PATH
+
+
+def start_workers(count: int, port: int, shared_dataset: str) -> dict:
+    """
+    Starts the GUI workers attached to the shared dataset
+
+    Returns:
+        - the worker processes by port
+    """
+    workers = {}
+    for worker_port in range(port + 1, port + 1 + count):
+        environment = dict(
+            os.environ,
+            FRAUD_SHARED_DATASET=shared_dataset,
+            GUI_PORT=str(worker_port),
+        )
+        workers[worker_port] = subprocess.Popen(
+            [sys.executable, "main.py"], env=environment
+        )
+    return workers
+
+
+def create_router(port: int, workers: dict) -> ThreadingHTTPServer:
+    """
+    Creates the server redirecting each new visitor to the next running worker
+    """
+    ports = itertools.cycle(sorted(workers))
+    lock = threading.Lock()
+
+    def next_port():
+        with lock:
+            for _ in range(len(workers)):
+                worker_port = next(ports)
+                if workers[worker_port].poll() is None:
+                    return worker_port
+        return None
+
+    class Router(BaseHTTPRequestHandler):
+        def do_GET(self):
+            worker_port = next_port()
+            if worker_port is None:
+                self.send_error(503, "No worker is running")
+                return
+            host = (self.headers.get("Host") or "localhost").rsplit(":", 1)[0]
+            self.send_response(302)
+            self.send_header("Location", f"http://{host}:{worker_port}{self.path}")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+
+    return ThreadingHTTPServer(("", port), Router)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--shared-dataset", default=SHARED_DATASET_PATH)
+    args = parser.parse_args()
+
+    # The loader runs in its own process, its copy of the dataset is freed on exit
+    subprocess.run(
+        [sys.executable, "-m", "data.shared_dataset", args.shared_dataset], check=True
+    )
+    workers = start_workers(args.workers, args.port, args.shared_dataset)
+    router = create_router(args.port, workers)
+    try:
+        router.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers.values():
+            worker.terminate()
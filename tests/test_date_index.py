@@ -0,0 +1,30 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+from data.date_index import DateIndex
+
+
+def test_window_bounds_exclude_the_end_date():
+    index = DateIndex(
+        pd.Series(["2020-06-21 10:00:00", "2020-06-22 00:00:00", "2020-06-22 23:59:59"])
+    )
+
+    assert (index.first_day, index.last_day) == (
+        dt.date(2020, 6, 21),
+        dt.date(2020, 6, 22),
+    )
+    assert index.bounds("2020-06-21", "2020-06-22") == (0, 1)
+    assert index.bounds("2020-06-22", "2020-06-23") == (1, 3)
+
+
+def test_empty_index_has_no_days():
+    index = DateIndex(pd.Series([], dtype="datetime64[ns]"))
+
+    assert len(index) == 0
+    assert index.bounds("2020-06-21", "2020-06-22") == (0, 0)
+    with pytest.raises(ValueError):
+        index.first_day
+    with pytest.raises(ValueError):
+        index.last_day
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("flask")
+
+from instrumentation import callback_metrics, instrument
+
+
+def on_change(state, var_name, var_value):
+    return state, var_name, var_value
+
+
+def save_analysis(state, decision=0):
+    return state, decision
+
+
+@pytest.mark.parametrize("function", [on_change, save_analysis])
+def test_decoration_keeps_the_argument_count(function):
+    # Taipy passes a callback as many arguments as __code__.co_argcount
+    for decorated in [instrument(function), instrument(kind="expression")(function)]:
+        assert decorated.__code__.co_argcount == function.__code__.co_argcount
+        assert decorated.__name__ == function.__name__
+
+
+def test_decorated_function_is_called_and_measured():
+    decorated = instrument(save_analysis)
+
+    assert decorated("state") == ("state", 0)
+    assert decorated("state", decision=1) == ("state", 1)
+    assert decorated("state", 1) == ("state", 1)
+    key = ("wall", "callback", "save_analysis")
+    assert callback_metrics.histograms[key].count == 3
+
+
+def test_methods_keep_the_argument_count():
+    class Page:
+        @instrument
+        def accept(self, state, id, payload):
+            return id
+
+    assert Page.accept.__code__.co_argcount == 4
+    assert Page().accept(None, "news-1", {}) == "news-1"
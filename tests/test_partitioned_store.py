@@ -0,0 +1,36 @@
+import multiprocessing
+
+import pandas as pd
+
+from data.partitioned_store import append_transactions, load_transactions, read_catalog
+
+
+def transactions(writer: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "trans_date_trans_time": [f"2020-06-21 10:00:{writer:02d}"] * 50,
+            "trans_num": [f"{writer}-{row}" for row in range(50)],
+            "amt": [float(writer)] * 50,
+        }
+    )
+
+
+def append(path: str, writer: int):
+    append_transactions(transactions(writer), path)
+
+
+def test_concurrent_appends_keep_every_partition(tmp_path):
+    path = str(tmp_path / "store")
+    writers = [
+        multiprocessing.Process(target=append, args=(path, writer))
+        for writer in range(8)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    catalog = read_catalog(path)
+    assert catalog["version"] == 8
+    assert len(set(catalog["partitions"]["2020-06-21"]["files"])) == 8
+    assert len(load_transactions(path)) == 8 * 50
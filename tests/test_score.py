@@ -0,0 +1,94 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+xgb = pytest.importorskip("xgboost")
+
+import score
+from data.scoring import FEATURE_COLUMNS
+
+SHAP_COLUMNS = [f"shap_{name}" for name in FEATURE_COLUMNS] + ["shap_base"]
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    rng = np.random.default_rng(0)
+    model = xgb.XGBRegressor(n_estimators=2, max_depth=2)
+    model.fit(rng.random((50, len(FEATURE_COLUMNS))), rng.random(50))
+    path = tmp_path / "model.pkl"
+    with open(path, "wb") as model_file:
+        pickle.dump(model, model_file)
+    return str(path)
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    # The first chunk of 2 rows is before the window, so it is scored empty
+    transactions = pd.DataFrame(
+        {
+            "trans_date_trans_time": [
+                "2019-01-01 10:00:00",
+                "2019-01-02 11:00:00",
+                "2020-06-22 12:00:00",
+                "2020-06-23 13:00:00",
+            ],
+            "cc_num": [1, 2, 1, 2],
+            "category": ["food_dining", "travel", "entertainment", "home"],
+            "amt": [10.0, 20.0, 30.0, 40.0],
+            "zip": [10001, 10002, 10001, 10002],
+            "city_pop": [1000, 2000, 1000, 2000],
+            "state": ["NY", "CA", "NY", "CA"],
+            "dob": ["1980-01-01", "1990-01-01", "1980-01-01", "1990-01-01"],
+        }
+    )
+    path = tmp_path / "transactions.csv"
+    transactions.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".arrow"])
+def test_empty_first_chunk_keeps_shap_columns(
+    tmp_path, model_path, input_path, extension
+):
+    output_path = str(tmp_path / f"scored{extension}")
+    summary = score.score_file(
+        input_path,
+        output_path,
+        explain=True,
+        chunk_rows=2,
+        model_path=model_path,
+    )
+
+    assert summary["chunks"] == 2
+    assert summary["scored"] == 2
+    if extension == ".csv":
+        scored = pd.read_csv(output_path)
+    elif extension == ".parquet":
+        scored = pd.read_parquet(output_path)
+    else:
+        scored = pd.read_feather(output_path)
+    assert set(SHAP_COLUMNS) <= set(scored.columns)
+    assert len(scored) == 2
+    assert scored[SHAP_COLUMNS].notna().all().all()
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet"])
+def test_no_scored_rows_keeps_shap_columns(tmp_path, model_path, input_path, extension):
+    output_path = str(tmp_path / f"scored{extension}")
+    score.score_file(
+        input_path,
+        output_path,
+        start_date="2021-01-01",
+        explain=True,
+        chunk_rows=2,
+        model_path=model_path,
+    )
+
+    if extension == ".csv":
+        scored = pd.read_csv(output_path)
+    else:
+        scored = pd.read_parquet(output_path)
+    assert set(SHAP_COLUMNS) <= set(scored.columns)
+    assert len(scored) == 0
@@ -1,38 +1,31 @@
 """ Data Manipulation and Callbacks """
 
 import datetime as dt
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 
 from taipy.gui import State, navigate, notify
-import xgboost as xgb
-from shap import Explainer, Explanation
-from sklearn.metrics import confusion_matrix
 
 from client import Transaction, Client
-
-column_names = [
-    "amt",
-    "zip",
-    "city_pop",
-    "age",
-    "hour",
-    "day",
-    "month",
-    "category_food_dining",
-    "category_gas_transport",
-    "category_grocery_net",
-    "category_grocery_pos",
-    "category_health_fitness",
-    "category_home",
-    "category_kids_pets",
-    "category_misc_net",
-    "category_misc_pos",
-    "category_personal_care",
-    "category_shopping_net",
-    "category_shopping_pos",
-    "category_travel",
-]
+from instrumentation import instrument
+from data.data import data as original_data
+from data.data import data_transaction, dataset_version, explanation
+from data.data import transaction_index, client_transaction_index, date_index
+from data.scoring import DATE_FORMAT, FEATURE_COLUMNS, validate_window
+from data.velocity import WINDOWS, VelocityEngine
+from data.feature_importance import (
+    SEGMENTATIONS,
+    FeatureImportance,
+    compute_feature_importance,
+)
+
+# Number of thresholds whose results are kept in memory
+THRESHOLD_CACHE_SIZE = 4
+# Number of date windows whose results are kept in memory, for any threshold
+WINDOW_CACHE_SIZE = 16
+
+column_names = FEATURE_COLUMNS
 
 
 def fraud_style(_: State, index: int, values: list) -> str:
@@ -53,24 +46,23 @@ def fraud_style(_: State, index: int, values: list) -> str:
     return ""
 
 
-def explain_pred(state: State, var_name: str, payload: dict) -> None:
+def explanation_data(exp) -> pd.DataFrame:
     """
-    When a transaction is selected in the table
-    Explain the prediction using SHAP, update the waterfall chart
+    Returns the 5 features with the most influence on a prediction
 
     Args:
-        - state: the state of the app
-        - payload: the payload of the event containing the index of the transaction
-    """
-    idx = payload["index"]
-    exp = state.explanation[idx]
+        - exp: the SHAP explanation of the prediction
 
+    Returns:
+        - a DataFrame with the Feature, with its value, and its Influence
+    """
     feature_values = [-value for value in list(exp.values)]
     data_values = list(exp.data)
 
     for i, value in enumerate(data_values):
-        if isinstance(value, float):
-            value = round(value, 2)
+        if isinstance(value, (float, np.floating)):
+            # float() first, the explanations are stored as float32
+            value = round(float(value), 2)
             data_values[i] = value
 
     names = [f"{name}: {value}" for name, value in zip(column_names, data_values)]
@@ -79,8 +71,68 @@ def explain_pred(state: State, var_name: str, payload: dict) -> None:
     exp_data["abs_importance"] = exp_data["Influence"].abs()
     exp_data = exp_data.sort_values(by="abs_importance", ascending=False)
     exp_data = exp_data.drop(columns=["abs_importance"])
-    exp_data = exp_data[:5]
-    state.exp_data = exp_data
+    return exp_data[:5]
+
+
+@lru_cache(maxsize=1)
+def get_velocity_features(version: str) -> np.ndarray:
+    """
+    Computes the rolling activity of the card of every transaction in one pass,
+    once per dataset version. The rows are in the order of the transactions.
+    Cards are the key of the activity, as in score.py, here by their "Credit
+    Card Number", the cc_num truncated when the dataset is loaded
+
+    Args:
+        - version: the version of the dataset
+    """
+    return (
+        VelocityEngine()
+        .transform_frame(
+            data_transaction, "Credit Card Number", "trans_date_trans_time", "Amount"
+        )
+        .to_numpy()
+    )
+
+
+def velocity_data(idx: int) -> tuple:
+    """
+    Returns the recent activity of the card of a transaction when it was made
+
+    Args:
+        - idx: the position of the transaction in all the transactions
+
+    Returns:
+        - a DataFrame with the Window, the number of Transactions and their Amount,
+          and the hours since the previous transaction, None for the first
+          transaction of the card
+    """
+    features = get_velocity_features(dataset_version)[idx]
+    windows = len(WINDOWS)
+    activity = pd.DataFrame(
+        {
+            "Window": list(WINDOWS),
+            "Transactions": features[:windows].astype(int),
+            "Amount": features[windows : 2 * windows].round(2),
+        }
+    )
+    if np.isnan(features[-1]):
+        return activity, None
+    return activity, float(round(features[-1] / 3600, 1))
+
+
+@instrument
+def explain_pred(state: State, var_name: str, payload: dict) -> None:
+    """
+    When a transaction is selected in the table
+    Explain the prediction using SHAP, update the waterfall chart
+
+    Args:
+        - state: the state of the app
+        - payload: the payload of the event containing the index of the transaction
+    """
+    # The index of a row of any window is its position in all the transactions
+    idx = payload["index"]
+    state.exp_data = explanation_data(state.explanation[idx])
 
     if state.transactions.iloc[idx]["Fraud"]:
         state.fraud_text = "Why is this transaction fraudulent?"
@@ -89,9 +141,10 @@ def explain_pred(state: State, var_name: str, payload: dict) -> None:
 
     client = state.transactions.iloc[idx]["Client"]
 
-    state.specific_transactions = state.transactions[
-        (state.transactions["Client"] == client)
-    ]
+    state.specific_transactions = client_transaction_index.take(
+        state.transactions, client
+    )
+    state.velocity_data, state.hours_since_last = velocity_data(idx)
 
     state.selected_transaction = state.transactions.loc[[idx]]
 
@@ -102,45 +155,101 @@ def explain_pred(state: State, var_name: str, payload: dict) -> None:
     state.client = Client(data.loc[idx, "Client"])
 
 
-def update_threshold(state: State) -> None:
+def with_fraud(transactions: pd.DataFrame, threshold: float) -> pd.DataFrame:
     """
-    Change the threshold used to determine if a transaction is fraudulent
-    Generate the confusion matrix
+    Returns the transactions with the Fraud column computed for the threshold
+    The other columns are shared with the given DataFrame, which is left untouched
 
     Args:
-        - state: the state of the app
+        - transactions: the transactions with their Fraud Value
+        - threshold: the threshold used to determine if a transaction is fraudulent
     """
-    threshold = float(state.threshold)
-    results = [
-        float(result) > threshold for result in state.transactions["Fraud Value"]
-    ]
-    state.transactions["Fraud"] = results
-    state.transactions = state.transactions
-    results = [
-        float(result) > threshold
-        for result in state.original_transactions["Fraud Value"]
-    ]
-    state.original_transactions["Fraud"] = results
-    state.original_transactions = state.original_transactions
-    y_pred = results
-    y_true = state.original_transactions["is_fraud"]
-    cm = confusion_matrix(y_true, y_pred)
-    cm = cm.astype("float") / cm.sum(axis=1)[:, np.newaxis]
+    transactions = transactions.copy(deep=False)
+    transactions["Fraud"] = transactions["Fraud Value"].astype(float).values > threshold
+    return transactions
+
+
+@lru_cache(maxsize=THRESHOLD_CACHE_SIZE)
+def get_transactions(version: str, threshold: float) -> pd.DataFrame:
+    """
+    Returns all the transactions with the Fraud column computed for the threshold
+    Their row order is the one of the lookup indexes, whatever the window
+
+    Args:
+        - version: the version of the dataset
+        - threshold: the threshold used to determine if a transaction is fraudulent
+    """
+    return with_fraud(data_transaction, threshold)
+
+
+@lru_cache(maxsize=1)
+def get_feature_importance(version: str) -> FeatureImportance:
+    """
+    Reduces the stored explanations of all the transactions, once per dataset
+    version. The result is shared between sessions and must not be modified.
+    A new version is reduced from scratch: its explanations are written whole,
+    see write_explanations. Only score.py adds the rows of each scored chunk
+    to the same FeatureImportance
+
+    Args:
+        - version: the version of the dataset
+    """
+    return compute_feature_importance(
+        explanation.values, original_data[SEGMENTATIONS], explanation.features
+    )
+
+
+def get_window(dates) -> tuple:
+    """
+    Returns the window selected in the date range control, whose first and
+    last days are both included
+
+    Args:
+        - dates: the first and the last day of the window
+
+    Returns:
+        - the first day, and the day after the last day, which is excluded
+    """
+    start_date, end_date = (pd.Timestamp(date).date() for date in dates)
+    end_date += dt.timedelta(days=1)
+    return start_date.strftime(DATE_FORMAT), end_date.strftime(DATE_FORMAT)
+
+
+@lru_cache(maxsize=WINDOW_CACHE_SIZE)
+def get_threshold_results(
+    version: str, threshold: float, start_date: str = None, end_date: str = None
+) -> dict:
+    """
+    Computes everything that depends on the threshold and the date window, once
+    per dataset version. Only the transactions of the window are re-scored.
+    The results are shared by reference between sessions and must not be modified
+
+    Args:
+        - version: the version of the dataset
+        - threshold: the threshold used to determine if a transaction is fraudulent
+        - start_date: the start date of the window, the first date if None
+        - end_date: the excluded end date of the window, after the last date if None
+
+    Returns:
+        - the values of the state variables for this threshold and window
+    """
+    transactions = get_transactions(version, threshold)
+    start, stop = 0, len(transactions)
+    if start_date is not None:
+        start, stop = date_index.bounds(start_date, end_date)
+    original_transactions = with_fraud(original_data.iloc[start:stop], threshold)
+
+    y_pred = original_transactions["Fraud"]
+    y_true = original_transactions["is_fraud"]
+    # Confusion matrix, actual values in rows and predicted values in columns
+    cm = np.bincount(
+        2 * y_true.astype(int).values + y_pred.astype(int).values, minlength=4
+    ).reshape(2, 2)
+    # An empty window has no rate
+    cm = cm.astype("float") / np.maximum(cm.sum(axis=1), 1)[:, np.newaxis]
     tp, tn, fp, fn = cm[1][1], cm[0][0], cm[0][1], cm[1][0]
 
-    dataset = state.original_transactions[:10000]
-    state.true_positives = dataset[
-        (dataset["is_fraud"] == True) & (dataset["Fraud"] == True)
-    ]
-    state.true_negatives = dataset[
-        (dataset["is_fraud"] == False) & (dataset["Fraud"] == False)
-    ]
-    state.false_positives = dataset[
-        (dataset["is_fraud"] == False) & (dataset["Fraud"] == True)
-    ]
-    state.false_negatives = dataset[
-        (dataset["is_fraud"] == True) & (dataset["Fraud"] == False)
-    ]
+    dataset = original_transactions[:10000]
 
     data = {
         "Values": [
@@ -171,8 +280,41 @@ def update_threshold(state: State) -> None:
             }
             layout["annotations"].append(annotation)
 
-    state.confusion_data = data
-    state.confusion_layout = layout
+    return {
+        "transactions": transactions,
+        "window_transactions": transactions.iloc[start:stop],
+        "original_transactions": original_transactions,
+        "true_positives": dataset[
+            (dataset["is_fraud"] == True) & (dataset["Fraud"] == True)
+        ],
+        "true_negatives": dataset[
+            (dataset["is_fraud"] == False) & (dataset["Fraud"] == False)
+        ],
+        "false_positives": dataset[
+            (dataset["is_fraud"] == False) & (dataset["Fraud"] == True)
+        ],
+        "false_negatives": dataset[
+            (dataset["is_fraud"] == True) & (dataset["Fraud"] == False)
+        ],
+        "confusion_data": data,
+        "confusion_layout": layout,
+    }
+
+
+@instrument
+def update_threshold(state: State) -> None:
+    """
+    Change the threshold used to determine if a transaction is fraudulent
+    Attach the session to the shared results of this threshold and date window
+
+    Args:
+        - state: the state of the app
+    """
+    results = get_threshold_results(
+        dataset_version, float(state.threshold), *get_window(state.dates)
+    )
+    for name, value in results.items():
+        setattr(state, name, value)
     update_table(state)
     return (
         state.true_positives,
@@ -182,6 +324,23 @@ def update_threshold(state: State) -> None:
     )
 
 
+@instrument
+def update_window(state: State) -> None:
+    """
+    Re-scores and re-aggregates the transactions of the selected date window
+    Windows already seen are served from the cache
+
+    Args:
+        - state: the state of the app
+    """
+    try:
+        validate_window(*get_window(state.dates))
+    except ValueError as error:
+        notify(state, "error", str(error))
+        return
+    update_threshold(state)
+
+
 def update_table(state: State) -> None:
     """
     Updates the table of transactions displayed
@@ -196,4 +355,61 @@ def update_table(state: State) -> None:
     elif state.selected_table == "True Negatives":
         state.displayed_table = state.true_negatives
     elif state.selected_table == "False Negatives":
-        state.displayed_table = state.false_negatives
\ No newline at end of file
+        state.displayed_table = state.false_negatives
+
+
+def update_transactions_to_analyze_table(state: State) -> None:
+    """
+    Updates the table of transactions to analyze from the review queue
+    Only the rows of the transactions added or removed since the last update change
+
+    Args:
+        - state: the state of the app
+    """
+    table = state.transactions_to_analyze_table
+    if table is None:
+        table = state.transactions.iloc[[]]
+    queued = set(state.transactions_to_analyze)
+    shown = set(table["Transaction Number"])
+
+    if shown - queued:
+        table = table[table["Transaction Number"].isin(queued)]
+    added = [t for t in state.transactions_to_analyze if t not in shown]
+    if added:
+        rows = state.transactions.iloc[transaction_index.get_many(added)]
+        table = pd.concat([table, rows.round(2)])
+    state.transactions_to_analyze_table = table
+
+
+def update_historical_transactions_table(state: State) -> None:
+    """
+    Updates the table of previous transactions from the decision history
+    Only the rows of the transactions decided since the last update are looked up
+
+    Args:
+        - state: the state of the app
+    """
+    decisions = {
+        item["transaction_id"]: bool(item["decision"])
+        for item in state.historical_transactions
+    }
+    table = state.historical_transactions_table
+    if table is None:
+        table = state.transactions.iloc[[]]
+    shown = dict(zip(table["Transaction Number"], table["Fraud"]))
+
+    if shown.keys() - decisions.keys():
+        table = table[table["Transaction Number"].isin(decisions)]
+    changed = [
+        t for t, fraud in shown.items() if t in decisions and decisions[t] != fraud
+    ]
+    if changed:
+        table = table.copy()
+        mask = table["Transaction Number"].isin(changed)
+        table.loc[mask, "Fraud"] = table.loc[mask, "Transaction Number"].map(decisions)
+    added = [t for t in decisions if t not in shown]
+    if added:
+        rows = state.transactions.iloc[transaction_index.get_many(added)].copy()
+        rows["Fraud"] = rows["Transaction Number"].map(decisions)
+        table = pd.concat([table, rows.round(2)])
+    state.historical_transactions_table = table